@@ -1,72 +1,38 @@
-import time
 import os
 from src.Browser import Browser
-from src.Scraper import Scraper
-from src.Checker import Checker
-from src.Database import Database
-from src.Telegram import TelegramNotifier
-import json
+from src.Storage import open_database
+from src.Telegram import TelegramNotifier, TelegramQueue
+from src.Runner import Search, SearchRunner
+from src.Metrics import configure_from_env
 
-def main():
+SCRAPE_URL = "https://www.zonaprop.com.ar/ph-alquiler-saavedra-villa-urquiza-coghlan-villa-ortuzar-chacarita-colegiales-agronomia-parque-chas-villa-crespo-caballito-almagro-boedo-san-cristobal-la-paternal-villa-general-mitre-belgrano-r-belgrano-desde-1-hasta-2-habitaciones-desde-2-hasta-3-ambientes-publicado-hace-menos-de-2-dias-menos-1200000-pesos.html"
+
+def run_cycle(browser, db, notifier):
+    """
+    Corre una pasada completa de la búsqueda: recorre los resultados, procesa
+    los avisos nuevos, los guarda y notifica. Devuelve cuántos avisos guardó.
+    """
+    search = Search(name="gringo", scrape_url=SCRAPE_URL, profile="gringo")
+    return SearchRunner(browser, db, notifier, [search]).run_cycle()
 
-    scrape_url = "https://www.zonaprop.com.ar/ph-alquiler-saavedra-villa-urquiza-coghlan-villa-ortuzar-chacarita-colegiales-agronomia-parque-chas-villa-crespo-caballito-almagro-boedo-san-cristobal-la-paternal-villa-general-mitre-belgrano-r-belgrano-desde-1-hasta-2-habitaciones-desde-2-hasta-3-ambientes-publicado-hace-menos-de-2-dias-menos-1200000-pesos.html"
+def main():
+    metrics = configure_from_env()
     browser = Browser()
-    scraper_list = Scraper(browser_instance=browser, scrape_url=scrape_url)
-    new_posts = scraper_list.scrape_web()
     db_url = os.environ.get("DATABASE_URL")
-    db = Database(db_url) # Instanciamos la base de datos
+    db = open_database(db_url) # Instanciamos la base de datos
     
     telegram_token = os.environ.get("TELEGRAM_BOT_TOKEN")
     telegram_chat_id = os.environ.get("TELEGRAM_CHAT_ID")
-    notifier = TelegramNotifier(token=telegram_token, chat_id=telegram_chat_id) # Instanciamos el notificador
-
-    for url in new_posts:
-        # Filtrar URLs que no son de avisos reales
-        if "/propiedades/clasificado/" not in url:
-            continue
-        
-        # Evitar páginas institucionales o de ayuda
-        if any(exclude in url for exclude in ["help.zonaprop", "terminos-y-condiciones", "politica-de-privacidad"]):
-            continue
-
-        if not db.property_exists(url):
-            print(f"\n{'='*50}\nInmueble nuevo detectado (Gringo). Iniciando la extracción en: {url}\n")
-            
-            scraper = Scraper(browser)
-
-            # 1) Obtener HTML y datos estructurados
-            html = browser.get_text(url)
-            if not html:
-                print("❌ No se pudo obtener el HTML de la URL.")
-                continue
-
-            aviso_info = scraper.reduce_html_to_aviso_info(html)
-            if not aviso_info:
-                print("❌ No se pudo encontrar/parsear 'avisoInfo' dentro del HTML.")
-                continue
-            
-            try:
-                json_structured_info = json.loads(scraper.structured_attributes(aviso_info))
-            except json.JSONDecodeError:
-                print("❌ Error al decodificar el JSON estructurado.")
-                continue
-            
-            # Guardamos la propiedad en la base de datos
-            db.add_property(url, json_structured_info)
-            print(f"✅ Inmueble guardado en la base de datos.")
+    notifier = TelegramQueue(TelegramNotifier(token=telegram_token, chat_id=telegram_chat_id)) # Instanciamos el notificador
 
-            # En app_gringo no se realizan checks, se notifica directamente con la ficha
-            checker = Checker(json_structured_info)
-            summary = f"🚀 Nuevo aviso!\n\n"
-            summary += f"🔗 URL: {url}\n\n"
-            summary += checker.get_property_ficha()
+    run_cycle(browser, db, notifier)
 
-            notifier.send_message(summary)
-            print(f"🚀 Notificación enviada a Telegram.")
-            
-        else:
-            print(f"ℹ️ El inmueble en {url} ya fue procesado anteriormente. Omitiendo.")
+    if browser.cache:
+        print(f"🗄️ Cache HTTP: {browser.cache.stats()}")
 
+    notifier.close() # Envía los mensajes que queden en la cola
+    metrics.emit()
+    metrics.close()
     db.close() # Cerramos la conexión a la base de datos al final
 
 if __name__ == "__main__":
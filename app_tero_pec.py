@@ -1,71 +1,38 @@
-import time
 import os
 from src.Browser import Browser
-from src.Scraper import Scraper
-from src.Checker import Checker
-from src.Database import Database
-from src.Telegram import TelegramNotifier
-import json
+from src.Storage import open_database
+from src.Telegram import TelegramNotifier, TelegramQueue
+from src.Runner import Search, SearchRunner
+from src.Metrics import configure_from_env
 
-def main():
+SCRAPE_URL = "https://www.zonaprop.com.ar/casas-departamentos-ph-venta-villa-crespo-villa-del-parque-caballito-la-paternal-villa-general-mitre-villa-urquiza-colegiales-agronomia-3-ambientes-mas-50-m2-cubiertos-publicado-hace-menos-de-1-dia-menos-160000-dolar.html"
+
+def run_cycle(browser, db, notifier):
+    """
+    Corre una pasada completa de la búsqueda: recorre los resultados, procesa
+    los avisos nuevos, los guarda y notifica. Devuelve cuántos avisos guardó.
+    """
+    search = Search(name="tero_pec", scrape_url=SCRAPE_URL, profile="tero_pec")
+    return SearchRunner(browser, db, notifier, [search]).run_cycle()
 
-    scrape_url = "https://www.zonaprop.com.ar/casas-departamentos-ph-venta-villa-crespo-villa-del-parque-caballito-la-paternal-villa-general-mitre-villa-urquiza-colegiales-agronomia-3-ambientes-mas-50-m2-cubiertos-publicado-hace-menos-de-1-dia-menos-160000-dolar.html"
+def main():
+    metrics = configure_from_env()
     browser = Browser()
-    scraper_list = Scraper(browser_instance=browser, scrape_url=scrape_url)
-    new_posts = scraper_list.scrape_web()
     db_url = os.environ.get("DATABASE_URL")
-    db = Database(db_url) # Instanciamos la base de datos
+    db = open_database(db_url) # Instanciamos la base de datos
     
     telegram_token = os.environ.get("TELEGRAM_BOT_TOKEN")
     telegram_chat_id = os.environ.get("TELEGRAM_CHAT_ID")
-    notifier = TelegramNotifier(token=telegram_token, chat_id=telegram_chat_id) # Instanciamos el notificador
-
-    for url in new_posts:
-        if not db.property_exists(url):
-            print(f"\n{'='*50}\nInmueble nuevo detectado (Tero Pec). Iniciando la extracción en: {url}\n")
-            
-            scraper = Scraper(browser)
-
-            # 1) Obtener HTML y datos estructurados
-            html = browser.get_text(url)
-            if not html:
-                print("❌ No se pudo obtener el HTML de la URL.")
-                continue
-
-            aviso_info = scraper.reduce_html_to_aviso_info(html)
-            if not aviso_info:
-                print("❌ No se pudo encontrar/parsear 'avisoInfo' dentro del HTML.")
-                continue
-            
-            try:
-                json_structured_info = json.loads(scraper.structured_attributes(aviso_info))
-            except json.JSONDecodeError:
-                print("❌ Error al decodificar el JSON estructurado.")
-                continue
-            
-            # Guardamos la propiedad en la base de datos ANTES de procesarla con el Checker
-            db.add_property(url, json_structured_info)
-            print(f"✅ Inmueble guardado en la base de datos.")
+    notifier = TelegramQueue(TelegramNotifier(token=telegram_token, chat_id=telegram_chat_id)) # Instanciamos el notificador
 
-            # 2) Evaluar los atributos con el nuevo Checker
-            checker = Checker(json_structured_info)
-            checker.run_all_checks() # Se corre la nueva función principal de chequeos
-            
-            summary = f"🚀 *Nuevo aviso (Tero Pec)*\n\n"
-            summary += f"🔗 URL: {url}\n\n"
-            summary += "📋 *Ficha técnica:*\n"
-            summary += checker.get_property_ficha() + "\n\n"
-            summary += "🔍 *Resultados de los cheques:*\n"
-            summary += checker.get_summary()
+    run_cycle(browser, db, notifier)
 
-            # 4) (Opcional) Lógica de notificación si pasa todos los filtros
-            if checker.passed_avenue_check() and checker.passed_price_check():
-                notifier.send_message(summary)
-            else:
-                pass # No se notifica si no pasa los filtros
-        else:
-            print(f"ℹ️ El inmueble en {url} ya fue procesado anteriormente. Omitiendo.")
+    if browser.cache:
+        print(f"🗄️ Cache HTTP: {browser.cache.stats()}")
 
+    notifier.close() # Envía los mensajes que queden en la cola
+    metrics.emit()
+    metrics.close()
     db.close() # Cerramos la conexión a la base de datos al final
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+# benchmarks/bench_aviso_info.py
+"""
+Compara el parser de una sola pasada de avisoInfo contra el camino anterior
+basado en regex, sobre las páginas guardadas en benchmarks/fixtures. Mide la
+página entera y también solo el bloque <script> de avisoInfo, que es lo que
+reciben los dos caminos en producción desde que se descarga únicamente ese
+bloque (Scraper.fetch_aviso_info_block).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_aviso_info [archivo.html ...] [--runs N]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+from src.Scraper import Scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+# --- Camino anterior (regex), copiado tal cual para poder comparar ---
+def legacy_reduce_html_to_aviso_info(html_text):
+    match = re.search(r"const\s+avisoInfo\s*=\s*(\{[\s\S]*?\});", html_text, re.DOTALL)
+    if not match:
+        return None
+    cleaned = re.sub(r",\s*([\}\]])", r"\1", match.group(1).strip())
+    cleaned = re.sub(r"//.*$", "", cleaned, flags=re.MULTILINE)
+    cleaned = re.sub(r'(\w+)\s*:', r'"\1":', cleaned)
+    if cleaned.endswith(';'):
+        cleaned = cleaned[:-1].rstrip()
+    return cleaned
+
+
+LEGACY_PATTERNS = {
+    "id": r"'idAviso':\s*['\"](.*?)['\"]",
+    "title": r"'postingTitle'\s*:\s*['\"](.*?)['\"]",
+    "price": r"'price'\s*:\s*['\"](.*?)['\"]",
+    "expenses": r"'expenses'\s*:\s*['\"](.*?)['\"]",
+    "currency": r"'pricesData':\s*\[.*?\"currency\":\"(.*?)\"",
+    "location": r"'location':\s*{.*?['\"]name['\"]\s*:\s*['\"](.*?)['\"].*?}",
+    "property_type": r"'realEstateType':\s*{.*?['\"]name['\"]\s*:\s*['\"](.*?)['\"].*?}",
+    "bedrooms": r"['\"]label['\"]\s*:\s*['\"]dorm\.['\"].*?['\"]value['\"]\s*:\s*['\"](.*?)['\"]",
+    "bathrooms": r"['\"]label['\"]\s*:\s*['\"]baño['\"].*?['\"]value['\"]\s*:\s*['\"](.*?)['\"]",
+    "surface_total": r"['\"]label['\"]\s*:\s*['\"]tot\.['\"].*?['\"]value['\"]\s*:\s*['\"](.*?)['\"]",
+    "surface_covered": r"['\"]label['\"]\s*:\s*['\"]cub\.['\"].*?['\"]value['\"]\s*:\s*['\"](.*?)['\"]",
+    "description": r"'description'\s*:\s*(.*?)(?=\s*['\"]address['\"]\s*:)",
+    "address": r"'address':\s*{.*?['\"]name['\"]\s*:\s*['\"](.*?)['\"].*?}",
+    "publication_date": r"'postingDate':\s*['\"](.*?)['\"]",
+    "publisher_id": r"'publisherId':\s*['\"](.*?)['\"]",
+    "publisher_name": r"'publisher':\s*{.*?['\"]name['\"]\s*:\s*['\"](.*?)['\"].*?}",
+    "whatsapp": r"'whatsApp':\s*['\"](.*?)['\"]",
+    "general_features": r"'generalFeatures':\s*({.*?}),\s*'location'",
+    "main_features": r"'mainFeatures':\s*({.*?}),\s*'realEstateType'",
+}
+
+
+def legacy_structured_attributes(aviso_info_str):
+    structured = {}
+    for key, pattern in LEGACY_PATTERNS.items():
+        match = re.search(pattern, aviso_info_str, re.DOTALL)
+        if match:
+            value = match.group(1).strip()
+            if key in ["general_features", "main_features"]:
+                try:
+                    temp_json_str = value.replace("'", '"')
+                    temp_json_str = re.sub(r'\"(null|false|true)\"', r'\1', temp_json_str)
+                    structured[key] = json.loads(temp_json_str)
+                except json.JSONDecodeError:
+                    structured[key] = value
+            else:
+                structured[key] = value
+    if "description" in structured:
+        clean_description = re.sub(r'<[^>]+>', '', structured["description"])
+        structured["description"] = clean_description.replace("&quot;", '"').strip()
+    return json.dumps(structured, indent=2, ensure_ascii=False)
+
+
+def legacy_path(html):
+    return json.loads(legacy_structured_attributes(legacy_reduce_html_to_aviso_info(html)))
+
+
+def current_path(scraper, html):
+    return scraper.structured_attributes(scraper.reduce_html_to_aviso_info(html))
+
+
+def best_of(func, runs):
+    """Devuelve el mejor tiempo (en ms) de `runs` ejecuciones."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="Páginas HTML de avisos (por defecto, las de fixtures/)")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = args.pages or sorted(glob.glob(os.path.join(FIXTURES_DIR, "listing_*.html")))
+    scraper = Scraper(browser_instance=None)
+
+    print(f"{'página':<32} {'entrada':<8} {'KB':>7} {'regex (ms)':>11} {'parser (ms)':>12} {'speedup':>8}  "
+          f"campos distintos")
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        block = Scraper.slice_script_block(html, "const " + Scraper.AVISO_INFO_MARKER)
+
+        for label, text in (("página", html), ("bloque", block)):
+            legacy_ms = best_of(lambda: legacy_path(text), args.runs)
+            current_ms = best_of(lambda: current_path(scraper, text), args.runs)
+
+            legacy, current = legacy_path(text), current_path(scraper, text)
+            # La descripción del camino anterior arrastraba comillas y comas del literal JS
+            differing = [k for k in legacy if k != "description" and legacy[k] != current.get(k)]
+
+            print(f"{os.path.basename(path):<32} {label:<8} {len(text) / 1024:>7.0f} {legacy_ms:>11.2f} "
+                  f"{current_ms:>12.2f} {legacy_ms / current_ms:>7.1f}x  {', '.join(differing) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# benchmarks/bench_pipeline.py
+"""
+Recorre las páginas guardadas en benchmarks/fixtures con un Browser falso (sin
+red) por cada etapa del scraping: scrape_web sobre la página de resultados,
+recorte del bloque avisoInfo, reduce_html_to_aviso_info, structured_attributes
+y Checker.run_all_checks. Informa throughput, latencia p50/p99 y memoria pico
+de cada etapa, y la compara contra benchmarks/baseline.json.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_pipeline [--runs N] [--repeats 5] [--tolerance 0.25]
+    python -m benchmarks.bench_pipeline --save-baseline   # guarda los valores actuales como referencia
+
+Todas las etapas se miden --repeats veces, intercaladas, así las mediciones de
+cada una quedan repartidas a lo largo de toda la corrida. En una VM la
+velocidad cambia durante varios segundos seguidos, y el ruido solo puede
+sumar tiempo: se informa el mejor p50 de las repeticiones y la mediana del
+resto de las métricas. Sale con código 1 si alguna etapa empeoró más que la
+tolerancia.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from src.Checker import Checker
+from src.Scraper import Scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+SEARCH_URL = "https://www.zonaprop.com.ar/ph-venta-villa-crespo.html"
+
+
+class FakeBrowser:
+    """
+    Browser que sirve páginas guardadas en lugar de ir a la red. Las búsquedas
+    (cualquier URL que no sea de un aviso) devuelven la página de resultados.
+    """
+    def __init__(self, search_html, listing_html):
+        self.search_html = search_html
+        self.listing_html = listing_html
+
+    def get_text(self, url):
+        return self.listing_html if "/propiedades/clasificado/" in url else self.search_html
+
+    def get_script_block(self, url, markers, chunk_size=16384):
+        return Scraper.slice_script_block(self.get_text(url), markers)
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(func, runs, rounds=5):
+    """
+    Corre `func` `runs` veces, repartidas en `rounds` tandas, y devuelve
+    throughput, p50/p99 (ms) y memoria pico (KB). El p50 es el de la mejor tanda,
+    como el best_of de bench_aviso_info: así el ruido de la máquina no se
+    confunde con una regresión.
+    """
+    func()  # calentamiento
+    latencies = []
+    round_medians = []
+    per_round = max(1, runs // rounds)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        round_latencies = []
+        for _ in range(per_round):
+            call_start = time.perf_counter()
+            func()
+            round_latencies.append(time.perf_counter() - call_start)
+        round_latencies.sort()
+        round_medians.append(percentile(round_latencies, 0.50))
+        latencies += round_latencies
+    total = time.perf_counter() - start
+    latencies.sort()
+
+    # La memoria se mide en una corrida aparte: tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ops_per_sec": round(len(latencies) / total, 1),
+        "p50_ms": round(min(round_medians) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def measure_stages(stages, runs, rounds=5, repeats=5):
+    """
+    measure() de cada etapa, `repeats` veces e intercalando las etapas. Devuelve
+    por etapa el mejor p50 y la mediana de las demás métricas.
+    """
+    samples = {name: [] for name in stages}
+    for _ in range(max(1, repeats)):
+        for name, func in stages.items():
+            samples[name].append(measure(func, runs, rounds))
+    results = {}
+    for name, stage_samples in samples.items():
+        result = {metric: statistics.median(sample[metric] for sample in stage_samples)
+                  for metric in stage_samples[0]}
+        result["p50_ms"] = min(sample["p50_ms"] for sample in stage_samples)
+        results[name] = result
+    return results
+
+
+def build_stages(search_html, listing_html):
+    """Etapas a medir: nombre -> función sin argumentos. Cada una recibe la salida ya calculada de la anterior."""
+    browser = FakeBrowser(search_html, listing_html)
+    search_scraper = Scraper(browser_instance=browser, scrape_url=SEARCH_URL)
+    scraper = Scraper(browser_instance=browser)
+
+    aviso_block = Scraper.slice_script_block(listing_html, "const " + Scraper.AVISO_INFO_MARKER)
+    aviso_info = scraper.reduce_html_to_aviso_info(aviso_block)
+    data = scraper.structured_attributes(aviso_info)
+
+    return {
+        "scrape_web": search_scraper.scrape_web,
+        "slice_aviso_info": lambda: Scraper.slice_script_block(listing_html, "const " + Scraper.AVISO_INFO_MARKER),
+        "reduce_html_to_aviso_info": lambda: scraper.reduce_html_to_aviso_info(aviso_block),
+        "structured_attributes": lambda: scraper.structured_attributes(aviso_info),
+        "checker": lambda: Checker(data).run_all_checks(),
+    }
+
+
+# Diferencias absolutas por debajo de las cuales no se marca regresión: en las
+# etapas de microsegundos el ruido de la máquina supera cualquier tolerancia relativa
+MIN_DELTA = {"p50_ms": 0.02, "peak_kb": 1.0}
+
+# Tolerancia mínima por etapa. scrape_web arma el árbol completo de
+# BeautifulSoup: su tiempo depende del allocator y del GC y es la etapa que
+# más varía entre corridas con el mismo código.
+STAGE_TOLERANCE = {"scrape_web": 0.5}
+
+
+def compare(results, baseline, tolerance):
+    """Devuelve las regresiones: (etapa, métrica, referencia, actual)."""
+    regressions = []
+    for stage, current in results.items():
+        reference = baseline.get(stage)
+        if not reference:
+            continue
+        stage_tolerance = max(tolerance, STAGE_TOLERANCE.get(stage, 0))
+        for metric, min_delta in MIN_DELTA.items():
+            if not reference.get(metric):
+                continue
+            limit = max(reference[metric] * (1 + stage_tolerance), reference[metric] + min_delta)
+            if current[metric] > limit:
+                regressions.append((stage, metric, reference[metric], current[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5, help="Tandas en las que se reparten las corridas")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Mediciones completas de cada etapa, intercaladas (por defecto 5)")
+    parser.add_argument("--search", help="Página de resultados (por defecto fixtures/search_*.html)")
+    parser.add_argument("--listing", help="Página de aviso (por defecto fixtures/listing_*.html)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Empeoramiento relativo permitido de p50 y memoria pico (por defecto 0.25)")
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda los resultados como nueva referencia")
+    args = parser.parse_args()
+
+    search_path = args.search or sorted(glob.glob(os.path.join(FIXTURES_DIR, "search_*.html")))[0]
+    listing_path = args.listing or sorted(glob.glob(os.path.join(FIXTURES_DIR, "listing_*.html")))[0]
+    with open(search_path, encoding="utf-8") as f:
+        search_html = f.read()
+    with open(listing_path, encoding="utf-8") as f:
+        listing_html = f.read()
+
+    results = measure_stages(build_stages(search_html, listing_html), args.runs, args.rounds, args.repeats)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(f"{'etapa':<28} {'ops/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'pico (KB)':>10} {'vs. ref. p50':>13}")
+    for stage, result in results.items():
+        reference = baseline.get(stage, {}).get("p50_ms")
+        change = f"{(result['p50_ms'] / reference - 1) * 100:+.0f}%" if reference else "-"
+        print(f"{stage:<28} {result['ops_per_sec']:>10,.0f} {result['p50_ms']:>10.3f} "
+              f"{result['p99_ms']:>10.3f} {result['peak_kb']:>10,.1f} {change:>13}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"✅ Referencia guardada en {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for stage, metric, reference, current in regressions:
+        print(f"❌ Regresión en {stage}: {metric} {reference} → {current}")
+    if regressions:
+        sys.exit(1)
+    if baseline:
+        print(f"✅ Sin regresiones (tolerancia {args.tolerance:.0%}, más en STAGE_TOLERANCE).")
+
+
+if __name__ == "__main__":
+    main()
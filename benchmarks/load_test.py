@@ -0,0 +1,95 @@
+# benchmarks/load_test.py
+"""
+Prueba de carga del ciclo completo contra el servidor de benchmarks/mock_server.py:
+recorre la búsqueda, descarga y parsea cada aviso, lo evalúa, "guarda" y
+notifica por Telegram (al mock). Informa avisos por segundo de punta a punta
+para cada cantidad de workers indicada, así se puede ajustar FETCH_WORKERS,
+FETCH_RATE_LIMIT y los reintentos.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.load_test --workers 1,4,8 --latency 0.05 --fail-429 0.02
+    python -m benchmarks.load_test --scraper-api   # pasando por el endpoint de ScraperAPI del mock
+
+Por defecto guarda en una base SQLite en memoria; con --database-url usa la
+base indicada (postgresql://... o sqlite:///archivo.db).
+"""
+import argparse
+import os
+import time
+
+from benchmarks.mock_server import MockServer, add_config_arguments, config_from_args
+from src.Metrics import metrics
+
+
+def run_cycle(server, workers, args):
+    """Corre un ciclo completo con `workers` descargas en paralelo y devuelve (guardados, segundos, envío)."""
+    # Los módulos leen la configuración del entorno al crear cada objeto
+    os.environ["FETCH_WORKERS"] = str(workers)
+    os.environ["FETCH_RATE_LIMIT"] = str(args.rate_limit)
+    from src.Browser import Browser
+    from src.Storage import open_database
+    from src.Runner import Search, SearchRunner
+    from src.Telegram import TelegramNotifier, TelegramQueue
+    from src.Transport import Transport
+
+    browser = Browser(transport=Transport(), cache=False)
+    db = open_database(args.database_url or "sqlite://")
+    notifier = TelegramQueue(TelegramNotifier(token="load-test", chat_id="1"),
+                             chat_interval=args.telegram_interval)
+    search = Search(name="load-test", scrape_url=f"{server.base_url}/departamentos-venta-mock.html",
+                    profile=args.profile, max_pages=args.pages)
+    try:
+        start = time.monotonic()
+        saved = SearchRunner(browser, db, notifier, [search]).run_cycle()
+        elapsed = time.monotonic() - start
+        flush_start = time.monotonic()
+        notifier.close()
+        flush = time.monotonic() - flush_start
+    finally:
+        db.close()
+        browser.transport.close()
+    return saved, elapsed, flush
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,4,8", help="Cantidades de workers a probar, separadas por coma")
+    parser.add_argument("--rate-limit", type=float, default=0, help="FETCH_RATE_LIMIT (0 = sin límite)")
+    parser.add_argument("--profile", default="gringo", help="Perfil de la búsqueda (gringo notifica todo)")
+    parser.add_argument("--telegram-interval", type=float, default=0.0,
+                        help="Intervalo mínimo entre mensajes al mismo chat (por defecto 0)")
+    parser.add_argument("--scraper-api", action="store_true", help="Pide las páginas a través del endpoint de ScraperAPI del mock")
+    parser.add_argument("--database-url", help="Base a usar en lugar de SQLite en memoria")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(config_from_args(args)).start()
+    os.environ["ZONAPROP_BASE_URL"] = server.base_url
+    os.environ["TELEGRAM_API_URL"] = server.base_url
+    if args.scraper_api:
+        os.environ["SCRAPER_API_URL"] = server.base_url
+        os.environ["SCRAPER_API_KEY"] = "load-test"
+    print(f"🧪 Mock en {server.base_url} ({args.pages} páginas x {args.per_page} avisos)")
+
+    print(f"{'workers':>8} {'avisos':>7} {'ciclo (s)':>10} {'avisos/s':>9} {'envío (s)':>10} "
+          f"{'reintentos':>11} {'429/403':>8} {'duplicados':>11}")
+    try:
+        for workers in (int(w) for w in args.workers.split(",") if w.strip()):
+            before = metrics.snapshot()["counters"]
+            stats_before = server.stats_snapshot()
+            saved, elapsed, flush = run_cycle(server, workers, args)
+            after = metrics.snapshot()["counters"]
+            stats = server.stats_snapshot()
+            retries = after.get("http_retries", 0) - before.get("http_retries", 0)
+            duplicates = after.get("listings_duplicate", 0) - before.get("listings_duplicate", 0)
+            failures = sum(stats.get(key, 0) - stats_before.get(key, 0)
+                           for key in stats if key.endswith(("_429", "_403")))
+            rate = saved / elapsed if elapsed else 0
+            print(f"{workers:>8} {saved:>7} {elapsed:>10.2f} {rate:>9.1f} {flush:>10.2f} "
+                  f"{retries:>11} {failures:>8} {duplicates:>11}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
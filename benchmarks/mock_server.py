@@ -0,0 +1,289 @@
+# benchmarks/mock_server.py
+"""
+Servidor local que imita a Zonaprop, ScraperAPI y la API de bots de Telegram,
+para probar el ciclo completo (concurrencia, reintentos, notificaciones) sin
+salir a internet. Sirve:
+
+- Búsquedas: cualquier `*.html` fuera de /propiedades/ devuelve una página de
+  resultados con `--per-page` avisos; `-pagina-N` pagina y, pasada la última,
+  devuelve la última (como Zonaprop).
+- Avisos: /propiedades/clasificado/<slug>-<id>.html, con la página de
+  benchmarks/fixtures/listing_sample.html y el id / dirección / precio /
+  descripción propios. Con --duplicate-rate, una parte de los avisos repite la
+  descripción del anterior (el mismo inmueble publicado por otra inmobiliaria).
+- ScraperAPI: /?api_key=...&url=<url> sirve la página de `url`.
+- Telegram: POST /bot<token>/sendMessage responde {"ok": true}.
+- /_stats: contadores de requests por tipo y estado, en JSON.
+
+A cada request se le puede agregar latencia y, con cierta probabilidad, un 403
+o un 429 (con Retry-After / retry_after).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.mock_server --port 8800 --latency 0.05 --fail-429 0.02
+
+y después, por ejemplo:
+    ZONAPROP_BASE_URL=http://127.0.0.1:8800 TELEGRAM_API_URL=http://127.0.0.1:8800 python app_gringo.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+LISTING_TEMPLATE_ID = "53248711"
+LISTING_TEMPLATE_ADDRESS = "Vera 1234"
+LISTING_TEMPLATE_PRICE = "USD 128.000"
+LISTING_TEMPLATE_DESCRIPTION = "Excelente PH al frente, "
+
+# Palabras para que cada aviso tenga una descripción propia
+DESCRIPTION_WORDS = (
+    "amplio", "living", "comedor", "cocina", "integrada", "dormitorio", "placard", "baño",
+    "completo", "toilette", "lavadero", "terraza", "parrilla", "balcón", "contrafrente",
+    "frente", "reciclado", "original", "pisos", "madera", "roble", "calefacción", "losa",
+    "aire", "acondicionado", "cochera", "baulera", "vestidor", "escalera", "quincho",
+    "jardín", "planta", "alta", "baja", "muy", "buen", "estado", "impecable", "apto",
+    "profesional", "cerca", "subte", "colectivos", "plaza", "escuelas", "comercios",
+    "silencioso", "soleado", "orientación", "norte", "este", "oeste", "vista", "abierta",
+)
+
+PAGE_NUMBER = re.compile(r'-pagina-(\d+)\.html$')
+LISTING_ID = re.compile(r'-(\d+)\.html$')
+
+
+class MockConfig:
+    """Comportamiento del servidor: latencia, fallas inyectadas y tamaño de las búsquedas."""
+    def __init__(self, latency=0.0, jitter=0.0, fail_403=0.0, fail_429=0.0, retry_after=1,
+                 pages=5, per_page=20, duplicate_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_403 = fail_403
+        self.fail_429 = fail_429
+        self.retry_after = retry_after
+        self.pages = pages
+        self.per_page = per_page
+        self.duplicate_rate = duplicate_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+
+    def roll(self):
+        with self.random_lock:
+            return self.random.random(), self.random.uniform(-self.jitter, self.jitter)
+
+
+class MockZonaprop:
+    """Arma las páginas de búsqueda y de avisos a partir de los fixtures."""
+    def __init__(self, config, base_url):
+        self.config = config
+        self.base_url = base_url
+        with open(os.path.join(FIXTURES_DIR, "listing_sample.html"), encoding="utf-8") as f:
+            self.listing_template = f.read()
+
+    def posting_id(self, page, index):
+        return 60000000 + page * 1000 + index
+
+    def search_page(self, page):
+        page = max(1, min(page, self.config.pages))
+        entities, postings = [], []
+        for index in range(self.config.per_page):
+            posting_id = self.posting_id(page, index)
+            path = f"/propiedades/clasificado/veclapin-ph-3-ambientes-mock-{posting_id}.html"
+            entities.append({"@type": "Apartment", "url": self.base_url + path})
+            price = 90000 + (posting_id % 97) * 1000
+            postings.append({
+                "postingId": str(posting_id),
+                "url": path,
+                "priceOperationTypes": [{"prices": [{"amount": price, "currency": "USD"}]}],
+                "expenses": {"amount": 40000, "currency": "$"},
+            })
+        state = {"mainEntity": entities, "listStore": {"listPostings": postings}}
+        return ('<!DOCTYPE html><html><head><title>Mock Zonaprop</title></head><body>'
+                '<script id="preloadedData">window.__PRELOADED_STATE__ = '
+                + json.dumps(state, separators=(",", ":")) + ';</script></body></html>')
+
+    def description(self, posting_id):
+        """Comienzo de la descripción del aviso: propio, o el del anterior si toca duplicado."""
+        rng = random.Random(posting_id)
+        if rng.random() < self.config.duplicate_rate:
+            return self.description(posting_id - 1)
+        return " ".join(rng.choices(DESCRIPTION_WORDS, k=60)) + ". "
+
+    def listing_page(self, posting_id):
+        price = f"USD {90 + int(posting_id) % 97}.000"
+        return (self.listing_template
+                .replace(LISTING_TEMPLATE_ID, posting_id)
+                .replace(LISTING_TEMPLATE_ADDRESS, f"Vera {posting_id}")
+                .replace(LISTING_TEMPLATE_PRICE, price)
+                .replace(LISTING_TEMPLATE_DESCRIPTION, self.description(int(posting_id))))
+
+    def page_for(self, path):
+        """HTML de una ruta de Zonaprop, o None si no existe."""
+        if path.startswith("/propiedades/"):
+            match = LISTING_ID.search(path)
+            return self.listing_page(match.group(1)) if match else None
+        if path.endswith(".html"):
+            match = PAGE_NUMBER.search(path)
+            return self.search_page(int(match.group(1)) if match else 1)
+        return None
+
+
+def make_handler(site, config, stats, stats_lock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _count(self, kind, status):
+            with stats_lock:
+                stats[f"{kind}_{status}"] += 1
+
+        def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _delay_and_inject(self, kind, telegram=False):
+            """Aplica la latencia y, si toca, responde con una falla. Devuelve True si respondió."""
+            chance, jitter = config.roll()
+            delay = config.latency + jitter
+            if delay > 0:
+                time.sleep(delay)
+            if not telegram and chance < config.fail_403:
+                self._count(kind, 403)
+                self._send(403, "Forbidden")
+                return True
+            if chance < config.fail_403 + config.fail_429:
+                self._count(kind, 429)
+                body = json.dumps({"ok": False, "error_code": 429,
+                                   "parameters": {"retry_after": config.retry_after}})
+                self._send(429, body, "application/json", {"Retry-After": str(config.retry_after)})
+                return True
+            return False
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path == "/_stats":
+                with stats_lock:
+                    self._send(200, json.dumps(dict(stats)), "application/json")
+                return
+
+            kind = "zonaprop"
+            path = parts.path
+            if parts.path == "/" and "url" in parse_qs(parts.query):
+                # ScraperAPI: la página pedida viene en el parámetro url
+                kind = "scraperapi"
+                path = urlsplit(parse_qs(parts.query)["url"][0]).path
+
+            if self._delay_and_inject(kind):
+                return
+            html = site.page_for(path)
+            if html is None:
+                self._count(kind, 404)
+                self._send(404, "Not Found")
+                return
+            self._count(kind, 200)
+            self._send(200, html)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            if not re.match(r'^/bot[^/]+/sendMessage$', urlsplit(self.path).path):
+                self._count("telegram", 404)
+                self._send(404, json.dumps({"ok": False}), "application/json")
+                return
+            if self._delay_and_inject("telegram", telegram=True):
+                return
+            self._count("telegram", 200)
+            self._send(200, json.dumps({"ok": True, "result": {}}), "application/json")
+
+    return Handler
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # El Browser corta la descarga apenas tiene el bloque que busca: no es un error
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockServer:
+    """Servidor en un hilo propio; `base_url` apunta a él."""
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self.server = _QuietHTTPServer((host, port), None)
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self.site = MockZonaprop(self.config, self.base_url)
+        self.server.RequestHandlerClass = make_handler(self.site, self.config, self.stats, self._stats_lock)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-zonaprop", daemon=True)
+        self._thread.start()
+        return self
+
+    def stats_snapshot(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos de latencia por request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variación aleatoria de la latencia (segundos)")
+    parser.add_argument("--fail-403", type=float, default=0.0, help="Probabilidad de responder 403")
+    parser.add_argument("--fail-429", type=float, default=0.0, help="Probabilidad de responder 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After de los 429 (segundos)")
+    parser.add_argument("--pages", type=int, default=5, help="Páginas de resultados de cada búsqueda")
+    parser.add_argument("--per-page", type=int, default=20, help="Avisos por página de resultados")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0,
+                        help="Proporción de avisos que repiten la descripción del anterior")
+    parser.add_argument("--seed", type=int, help="Semilla para que las fallas sean reproducibles")
+
+
+def config_from_args(args):
+    return MockConfig(latency=args.latency, jitter=args.jitter, fail_403=args.fail_403,
+                      fail_429=args.fail_429, retry_after=args.retry_after, pages=args.pages,
+                      per_page=args.per_page, duplicate_rate=args.duplicate_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(config_from_args(args), host=args.host, port=args.port)
+    print(f"🧪 Mock de Zonaprop / ScraperAPI / Telegram en {server.base_url}")
+    print(f"   ZONAPROP_BASE_URL={server.base_url} SCRAPER_API_URL={server.base_url} "
+          f"TELEGRAM_API_URL={server.base_url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import importlib
+import os
+import random
+import signal
+import threading
+import time
+from src.Browser import Browser
+from src.Storage import open_database
+from src.Telegram import TelegramNotifier, TelegramQueue
+from src.Runner import Search, SearchRunner, load_searches
+from src.Metrics import configure_from_env
+
+# Apps que se pueden correr en modo daemon: nombre -> módulo con run_cycle()
+APPS = {
+    "gringo": "app_gringo",
+    "tero_pec": "app_tero_pec",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Corre una app en modo daemon: mantiene abiertos el navegador, "
+                    "la base y Telegram, y consulta la búsqueda cada cierto intervalo."
+    )
+    parser.add_argument("app", nargs="?", choices=sorted(APPS), help="App a correr")
+    parser.add_argument("--config", help="Archivo JSON/YAML con varias búsquedas a correr en el mismo proceso")
+    parser.add_argument("--track-prices", action="store_true",
+                        help="En cada ciclo, compara los avisos ya guardados con los precios de la "
+                             "página de resultados y registra/notifica las bajas")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="Solo recorre las búsquedas y encola los avisos nuevos en la base; "
+                             "los procesan los workers (worker.py)")
+    parser.add_argument("--once", action="store_true", help="Corre un solo ciclo y termina (para usar desde cron)")
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("POLL_INTERVAL", 600)),
+                        help="Segundos entre ciclos (por defecto POLL_INTERVAL o 600)")
+    parser.add_argument("--jitter", type=float, default=float(os.environ.get("POLL_JITTER", 60)),
+                        help="Variación aleatoria máxima, en segundos, sobre el intervalo (por defecto POLL_JITTER o 60)")
+    args = parser.parse_args()
+    if bool(args.app) == bool(args.config):
+        parser.error("Hay que indicar una app o un archivo --config (no ambos).")
+    return args
+
+
+def main():
+    args = parse_args()
+
+    metrics = configure_from_env()
+
+    # Todo se crea una sola vez y queda "caliente" entre ciclos
+    browser = Browser()
+    db = open_database()
+    # Los mensajes se envían desde una cola en segundo plano: el ciclo no espera a Telegram
+    notifier = TelegramQueue(TelegramNotifier(token=os.environ.get("TELEGRAM_BOT_TOKEN"),
+                                              chat_id=os.environ.get("TELEGRAM_CHAT_ID")))
+
+    if args.config:
+        searches = load_searches(args.config)
+        label = ", ".join(search.name for search in searches)
+    else:
+        app = importlib.import_module(APPS[args.app])
+        label = args.app
+        searches = [Search(name=args.app, scrape_url=app.SCRAPE_URL, profile=args.app)]
+    # Con --track-prices, los precios salen del mismo recorrido de los resultados que busca los avisos nuevos
+    runner = SearchRunner(browser, db, notifier, searches, track_prices=args.track_prices)
+    if args.enqueue:
+        run_cycle = runner.enqueue_cycle
+    elif args.config or args.track_prices:
+        run_cycle = runner.run_cycle
+    else:
+        run_cycle = lambda: app.run_cycle(browser, db, notifier)
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"🛑 Señal {signal.Signals(signum).name} recibida. Se termina al cerrar el ciclo actual.")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    cycle = 0
+    try:
+        while not stop.is_set():
+            cycle += 1
+            browser.retry_policy.reset_budget()
+            start = time.monotonic()
+            try:
+                saved = run_cycle()
+                status = f"{saved} aviso(s) {'encolado(s)' if args.enqueue else 'nuevo(s)'}"
+                if args.track_prices:
+                    changes = runner.track_prices()
+                    status += f", {changes} cambio(s) de precio"
+            except Exception as e:
+                # Un ciclo fallido no tira abajo el daemon; se reintenta en el próximo
+                status = f"error: {e!r}"
+                db.rollback()
+            elapsed = time.monotonic() - start
+            metrics.observe("cycle", elapsed)
+            metrics.emit(cycle=cycle, search=label, status=status)
+            print(f"⏱️ Ciclo {cycle} ({label}) terminado en {elapsed:.1f} s: {status}.")
+            if browser.cache:
+                print(f"🗄️ Cache HTTP: {browser.cache.stats()}")
+
+            if args.once:
+                break
+            wait = max(0.0, args.interval + random.uniform(-args.jitter, args.jitter))
+            print(f"💤 Próximo ciclo en {wait:.0f} s.")
+            stop.wait(wait)
+    finally:
+        notifier.close()  # envía lo que haya quedado en la cola
+        db.close()
+        metrics.close()
+        print("👋 Daemon detenido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import sys
+import time
+from src.Storage import open_database
+from src.Export import ParquetExporter
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Exporta las propiedades guardadas a Parquet con columnas tipadas "
+                    "(precio, moneda, expensas, m², ambientes, antigüedad, barrio), "
+                    "particionado por fecha de procesamiento."
+    )
+    parser.add_argument("--output", default="exports", help="Directorio de salida (por defecto exports/)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Filas por archivo (por defecto 5000)")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignora la marca de la última exportación y exporta todo de nuevo")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    exporter = ParquetExporter(args.output)
+    if args.full:
+        exporter.reset_watermark()
+    after_id = exporter.resume_after_id()
+    db = open_database()
+
+    start = time.monotonic()
+    total_rows = 0
+    try:
+        for rows in db.iter_properties(chunk_size=args.chunk_size, after_id=after_id):
+            total_rows += exporter.write_chunk(rows)
+    finally:
+        db.close()
+
+    elapsed = time.monotonic() - start
+    if total_rows:
+        print(f"✅ {total_rows} propiedades exportadas a {args.output} en {elapsed:.1f} s.", file=sys.stderr)
+    else:
+        print(f"ℹ️ No hay propiedades nuevas para exportar (última exportada: id {exporter.last_exported_id()}).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+import time
+from src.Storage import open_database
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Migra la tabla de propiedades al esquema con columnas tipadas e índices "
+                    "y completa las filas existentes por lotes."
+    )
+    parser.add_argument("--batch-size", type=int, default=1000, help="Filas por lote (por defecto 1000)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start = time.monotonic()
+    db = open_database(check_schema=False)
+    try:
+        # Las columnas y los índices que falten; los índices se crean sin bloquear las escrituras
+        db.migrate_schema()
+        print("🗄️ Esquema actualizado (columnas tipadas e índices).")
+        updated = db.backfill_typed_columns(batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"✅ {updated} propiedades completadas en {time.monotonic() - start:.1f} s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from src.Storage import open_database
+from src.Rules import DEFAULT_RULES, DEFAULT_PLAN, RulePlan
+
+# Plan compilado una vez por proceso del pool (ver _init_worker)
+_plan = DEFAULT_PLAN
+
+
+def _init_worker(rules_path):
+    global _plan
+    _plan = RulePlan.from_file(rules_path) if rules_path else DEFAULT_PLAN
+
+
+def evaluate_chunk(rows, required, report_all):
+    """
+    Evalúa un bloque de filas (id, url, processed_at, json_data) y devuelve las líneas del
+    reporte: las que pasan todos los chequeos `required` (o todas, con report_all).
+    """
+    lines = []
+    for row_id, url, _, data in rows:
+        if isinstance(data, str):
+            data = json.loads(data)
+        group, _, results = _plan.evaluate(data or {})
+        passed = {r.kind for r in results if r.status == "passed"}
+        matches = required.issubset(passed)
+        if matches or report_all:
+            lines.append(json.dumps({
+                "id": row_id,
+                "url": url,
+                "match": matches,
+                "group": group,
+                "results": [r._asdict() for r in results],
+            }, ensure_ascii=False))
+    return lines
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Vuelve a evaluar todas las propiedades guardadas contra los criterios "
+                    "del Checker (por ejemplo, después de cambiar los umbrales)."
+    )
+    parser.add_argument("--rules", help="JSON con las reglas (misma forma que DEFAULT_RULES). Por defecto, las actuales.")
+    parser.add_argument("--dump-rules", action="store_true", help="Imprime las reglas por defecto en JSON y termina")
+    parser.add_argument("--require", default="max_price,not_on_avenue",
+                        help="Tipos de chequeo que tienen que pasar para que una fila coincida "
+                             "(por defecto max_price,not_on_avenue, como Tero Pec)")
+    parser.add_argument("--all", action="store_true", help="Reporta todas las filas, no solo las que coinciden")
+    parser.add_argument("--output", help="Archivo JSON-lines de salida (por defecto, stdout)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Filas por bloque (por defecto 2000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Procesos del pool (por defecto, uno por CPU)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.dump_rules:
+        json.dump(DEFAULT_RULES, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+
+    required = {kind.strip() for kind in args.require.split(",") if kind.strip()}
+    db = open_database()
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+
+    start = time.monotonic()
+    total_rows = 0
+    total_lines = 0
+    # Como máximo dos bloques por proceso en vuelo: la memoria queda acotada
+    max_in_flight = max(1, args.workers) * 2
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(args.rules,)) as executor:
+            pending = set()
+
+            def drain(return_when):
+                nonlocal total_lines
+                done, not_done = wait(pending, return_when=return_when)
+                for future in done:
+                    lines = future.result()
+                    total_lines += len(lines)
+                    for line in lines:
+                        output.write(line + "\n")
+                pending.intersection_update(not_done)
+
+            for rows in db.iter_properties(chunk_size=args.chunk_size):
+                total_rows += len(rows)
+                pending.add(executor.submit(evaluate_chunk, rows, required, args.all))
+                if len(pending) >= max_in_flight:
+                    drain(FIRST_COMPLETED)
+            if pending:
+                drain(ALL_COMPLETED)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        db.close()
+
+    elapsed = time.monotonic() - start
+    rate = total_rows / elapsed if elapsed else 0
+    label = "filas" if args.all else "coincidencias"
+    print(f"✅ {total_rows} propiedades evaluadas en {elapsed:.1f} s ({rate:,.0f}/s). "
+          f"{total_lines} {label} escritas.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
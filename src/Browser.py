@@ -1,70 +1,225 @@
-import cloudscraper
 import time
 import requests
 import random
 import os
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlparse
+from src.Transport import Transport
+from src.Retry import RetryPolicy, CircuitBreaker
+from src.Cache import ResponseCache
+from src.Metrics import metrics
 
 class Browser():
-    def __init__(self) -> None:
+    def __init__(self, transport=None, retry_policy=None, circuit_breaker=None, cache=None) -> None:
         self.scraper_api_key = os.environ.get("SCRAPER_API_KEY")
+        self.scraper_api_url = os.environ.get("SCRAPER_API_URL", "http://api.scraperapi.com").rstrip("/")
         
-        if self.scraper_api_key:
+        if transport is not None:
+            self.transport = transport
+        elif self.scraper_api_key:
             # Si hay API Key, usamos requests simple ya que ScraperAPI maneja el JS/Cookies
-            self.session = requests.Session()
+            self.transport = Transport()
             print("🛡️ ScraperAPI detectada. Usando modo proxy residencial.")
         else:
             # Modo normal (local o sin API key)
-            self.session = cloudscraper.create_scraper(
-                browser={
-                    'browser': 'chrome',
-                    'platform': 'windows',
-                    'desktop': True
-                }
-            )
+            self.transport = Transport.cloudscraper()
             print("ℹ️ Iniciando navegador en modo estándar (Cloudscraper).")
+        self.session = self.transport.session
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        # Cache en disco opcional (HTTP_CACHE_PATH)
+        self.cache = cache if cache is not None else ResponseCache.from_env()
 
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
         ]
 
-    def get(self, url, retries=3, delay=5):
+    def _build_request(self, url):
+        """Devuelve la URL a pedir y los headers propios de este request."""
+        if self.scraper_api_key:
+            # Construir la URL de ScraperAPI
+            payload = {
+                'api_key': self.scraper_api_key,
+                'url': url,
+                'render': 'false', # Zonaprop no necesita renderizado JS para el HTML base
+                'premium': 'true'   # Usar IPs residenciales para evitar el 403
+            }
+            return f"{self.scraper_api_url}/?" + urlencode(payload), None, 60
+        # Modo normal con headers rotativos (por request, sin tocar
+        # el estado compartido del transporte)
+        return url, {'User-Agent': random.choice(self.user_agents)}, 30
+
+    def get(self, url, retries=None, stream=False, headers=None):
         # Limpieza de URL
         if url.endswith('.html.html'):
             url = url.replace('.html.html', '.html')
 
-        for i in range(retries):
+        attempts = retries or self.retry_policy.max_attempts
+        for i in range(attempts):
+            request_url, request_headers, timeout = self._build_request(url)
+            if headers:
+                request_headers = {**(request_headers or {}), **headers}
+            host = urlparse(request_url).netloc
+            if not self.circuit_breaker.allow(host):
+                print(f"⛔ {host} está bloqueando los requests. Se omite {url}.")
+                return None
+
             try:
-                if self.scraper_api_key:
-                    # Construir la URL de ScraperAPI
-                    payload = {
-                        'api_key': self.scraper_api_key,
-                        'url': url,
-                        'render': 'false', # Zonaprop no necesita renderizado JS para el HTML base
-                        'premium': 'true'   # Usar IPs residenciales para evitar el 403
-                    }
-                    proxy_url = 'http://api.scraperapi.com/?' + urlencode(payload)
-                    req = self.session.get(proxy_url, timeout=60)
-                else:
-                    # Modo normal con headers rotativos
-                    current_ua = random.choice(self.user_agents)
-                    self.session.headers.update({'User-Agent': current_ua})
-                    req = self.session.get(url, timeout=30)
-                
+                metrics.incr("http_requests")
+                req = self.transport.get(request_url, headers=request_headers, timeout=timeout, stream=stream)
                 req.raise_for_status()
+                self.circuit_breaker.record_success(host)
                 return req
             except requests.exceptions.RequestException as e:
-                print(f"⚠️ Error fetching {url} (Intento {i+1}/{retries}): {e}")
-                if i < retries - 1:
-                    time.sleep(delay)
-                else:
-                    print(f"❌ Fallo crítico al obtener {url} tras {retries} reintentos.")
+                response = e.response
+                status_code = response.status_code if response is not None else None
+                if response is not None:
+                    response.close()
+                print(f"⚠️ Error fetching {url} (Intento {i+1}/{attempts}): {e}")
+                metrics.incr("http_errors")
+                self.circuit_breaker.record_failure(host, status_code)
+
+                if not self.retry_policy.is_retryable(status_code):
+                    print(f"❌ Error no recuperable ({status_code}) al obtener {url}. No se reintenta.")
+                    return None
+                if i == attempts - 1:
+                    print(f"❌ Fallo crítico al obtener {url} tras {attempts} intentos.")
                     return None
+                if not self.retry_policy.consume_retry():
+                    print(f"❌ Se agotó el presupuesto de reintentos de la corrida. Se omite {url}.")
+                    return None
+                metrics.incr("http_retries")
+                time.sleep(self.retry_policy.delay(i, response))
         return None
 
+    def _validators(self, entry):
+        """
+        Headers de revalidación para una entrada vencida del cache. Con ScraperAPI
+        no se mandan porque el proxy no los reenvía al origen.
+        """
+        if not entry or self.scraper_api_key:
+            return None
+        headers = {}
+        if entry["etag"]:
+            headers['If-None-Match'] = entry["etag"]
+        if entry["last_modified"]:
+            headers['If-Modified-Since'] = entry["last_modified"]
+        return headers or None
+
+    def _cached_fetch(self, key, url, fetch):
+        """
+        Envuelve `fetch(url, headers)` con el cache: devuelve el texto guardado si
+        está fresco, revalida si está vencido y guarda lo nuevo. `fetch` devuelve
+        (texto, response) o (None, None) si falló.
+        """
+        entry = self.cache.lookup(key)
+        if entry and entry["fresh"]:
+            self.cache.record("hits")
+            return entry["text"]
+
+        start = time.monotonic()
+        text, response = fetch(url, self._validators(entry))
+        elapsed = time.monotonic() - start
+        if response is None:
+            return None
+
+        if response.status_code == 304 and entry:
+            self.cache.refresh(key)
+            self.cache.record("revalidated", elapsed)
+            return entry["text"]
+
+        self.cache.record("misses", elapsed)
+        if text is not None:
+            self.cache.store(key, text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return text
+
+    def _fetch_text(self, url, headers=None):
+        response = self.get(url, headers=headers)
+        if response is None:
+            return None, None
+        if response.status_code == 304:
+            return None, response
+        metrics.incr("bytes_downloaded", len(response.content))
+        return response.text, response
+
     def get_text(self, url):
-        response = self.get(url)
-        if response:
-            return response.text
-        return None
+        if self.cache:
+            return self._cached_fetch(url, url, self._fetch_text)
+        text, _ = self._fetch_text(url)
+        return text
+
+    def get_script_block(self, url, markers, chunk_size=16384):
+        """
+        Descarga la página en streaming y devuelve solo el bloque que empieza en
+        el primer marcador y termina en el </script> siguiente. Deja de leer la
+        respuesta apenas se cierra el bloque, así nunca se guarda el documento
+        completo en memoria. Con cache, se guarda solo el bloque.
+        """
+        if isinstance(markers, str):
+            markers = (markers,)
+
+        def fetch(url, headers):
+            return self._stream_script_block(url, markers, chunk_size, headers)
+
+        if self.cache:
+            return self._cached_fetch(f"{url}#{markers[0]}", url, fetch)
+        block, _ = fetch(url, None)
+        return block
+
+    def _stream_script_block(self, url, markers, chunk_size, headers=None):
+        """Devuelve (bloque, response); el bloque es None si no se encontró o hubo un 304."""
+        script_end = '</script>'
+
+        response = self.get(url, stream=True, headers=headers)
+        if not response:
+            return None, None
+        if response.status_code == 304:
+            response.close()
+            return None, response
+
+        # Si el servidor no informa la codificación asumimos UTF-8 (la de Zonaprop)
+        if not response.encoding or response.encoding.lower() == 'iso-8859-1':
+            response.encoding = 'utf-8'
+
+        # Lo que se conserva mientras no apareció el marcador: solo la cola
+        # necesaria para detectar un marcador partido entre dos chunks
+        keep = max(len(m) for m in markers) - 1
+        buffer = ''
+        block_start = None
+        # Tiempo dedicado a buscar el bloque (sin contar la espera de la red)
+        slice_seconds = 0.0
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size, decode_unicode=True):
+                if not chunk:
+                    continue
+                slice_start = time.perf_counter()
+                search_from = max(0, len(buffer) - (keep if block_start is None else len(script_end) - 1))
+                buffer += chunk
+
+                if block_start is None:
+                    positions = [p for p in (buffer.find(m, search_from) for m in markers) if p != -1]
+                    if not positions:
+                        buffer = buffer[-keep:] if keep else ''
+                        slice_seconds += time.perf_counter() - slice_start
+                        continue
+                    buffer = buffer[min(positions):]
+                    block_start = 0
+                    search_from = 0
+
+                end = buffer.find(script_end, search_from)
+                slice_seconds += time.perf_counter() - slice_start
+                if end != -1:
+                    return buffer[:end + len(script_end)], response
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Error leyendo {url}: {e}")
+            return None, None
+        finally:
+            metrics.observe("html_slice", slice_seconds)
+            # Bytes leídos de la red (comprimidos), aunque se corte antes del final
+            tell = getattr(response.raw, "tell", None)
+            if tell:
+                metrics.incr("bytes_downloaded", tell())
+            response.close()
+
+        # La página terminó sin cerrar el bloque: devolvemos lo que haya
+        return (buffer if block_start is not None else None), response
@@ -0,0 +1,135 @@
+# src/Cache.py
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from src.Metrics import metrics
+
+
+class ResponseCache:
+    """
+    Cache de respuestas HTTP en disco (sqlite) con cuerpos comprimidos.
+    Cada entrada tiene un TTL; vencida, se puede revalidar con ETag /
+    Last-Modified. Cuando se pasa de `max_entries` o `max_bytes`, se
+    descartan las menos usadas recientemente (LRU).
+    """
+    def __init__(self, path, ttl=None, max_entries=None, max_bytes=None):
+        if ttl is None:
+            ttl = float(os.environ.get("HTTP_CACHE_TTL", 300))
+        if max_entries is None:
+            max_entries = int(os.environ.get("HTTP_CACHE_MAX_ENTRIES", 5000))
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("HTTP_CACHE_MAX_MB", 200)) * 1024 * 1024
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+        self._fetch_seconds = 0.0
+        self._fetches = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self.conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        """Crea el cache si está definida HTTP_CACHE_PATH; si no, devuelve None."""
+        path = os.environ.get("HTTP_CACHE_PATH")
+        return cls(path) if path else None
+
+    def lookup(self, key):
+        """
+        Devuelve un dict con text, fresh, etag y last_modified, o None si la clave
+        no está. No cuenta hits ni misses: eso lo decide quien usa el cache.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+
+        body, etag, last_modified, stored_at = row
+        return {
+            "text": zlib.decompress(body).decode("utf-8"),
+            "fresh": time.time() - stored_at < self.ttl,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def store(self, key, text, etag=None, last_modified=None):
+        body = zlib.compress(text.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO responses (key, body, size, etag, last_modified, stored_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (key, body, len(body), etag, last_modified, now, now))
+            self._counters["stores"] += 1
+            self._evict()
+            self.conn.commit()
+
+    def refresh(self, key):
+        """La entrada se revalidó (304): vuelve a estar fresca por otro TTL."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+            self.conn.commit()
+
+    def _evict(self):
+        """Borra las entradas menos usadas hasta volver a los límites (con el lock tomado)."""
+        count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        evicted = 0
+        while count > self.max_entries or total > self.max_bytes:
+            row = self.conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            count -= 1
+            total -= row[1]
+            evicted += 1
+        self._counters["evictions"] += evicted
+
+    def record(self, counter, fetch_seconds=None):
+        """Suma uno al contador (hits, misses, revalidated) y registra la latencia de red si la hubo."""
+        metrics.incr(f"cache_{counter}")
+        with self._lock:
+            self._counters[counter] += 1
+            if fetch_seconds is not None:
+                self._fetch_seconds += fetch_seconds
+                self._fetches += 1
+
+    def stats(self):
+        """Contadores del cache y una estimación del tiempo ahorrado por los hits."""
+        with self._lock:
+            stats = dict(self._counters)
+            avg_fetch = self._fetch_seconds / self._fetches if self._fetches else 0.0
+        lookups = stats["hits"] + stats["misses"] + stats["revalidated"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["avg_fetch_seconds"] = round(avg_fetch, 3)
+        stats["saved_requests"] = stats["hits"]
+        stats["estimated_seconds_saved"] = round(stats["hits"] * avg_fetch, 1)
+        return stats
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -1,49 +1,583 @@
 # src/Database.py
 import psycopg2
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
 import datetime
+import functools
 import json
 import os
+import threading
+import time
+from src.Metrics import metrics
+from src.Retry import RetryPolicy
+from src.Dedup import posting_id_from_url
+from src.Storage import INSERT_COLUMNS, TYPED_COLUMNS, Storage
 
-class Database:
-    def __init__(self, db_url):
+# Tablas completas, con todas las columnas: solo se crean así en una base
+# nueva. Las tablas viejas se actualizan con migrate_schema (ver migrate.py).
+TABLES = {
+    "properties": f"""
+        CREATE TABLE IF NOT EXISTS properties (
+            id SERIAL PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            processed_at TIMESTAMP,
+            json_data JSONB,
+            {", ".join(f"{column} {sql_type}" for column, sql_type in TYPED_COLUMNS)}
+        )
+    """,
+    # Historial de cambios: solo se agregan filas cuando algo cambia
+    "price_history": """
+        CREATE TABLE IF NOT EXISTS price_history (
+            id BIGSERIAL PRIMARY KEY,
+            posting_id TEXT NOT NULL,
+            observed_at TIMESTAMP NOT NULL,
+            event TEXT NOT NULL,
+            price NUMERIC,
+            currency TEXT,
+            expenses NUMERIC,
+            previous_price NUMERIC
+        )
+    """,
+    # Cola de avisos por procesar, compartida por los workers (ver worker.py)
+    "listing_queue": """
+        CREATE TABLE IF NOT EXISTS listing_queue (
+            id BIGSERIAL PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            searches JSONB NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at TIMESTAMP NOT NULL DEFAULT now(),
+            leased_by TEXT,
+            lease_until TIMESTAMP,
+            last_error TEXT,
+            enqueued_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """,
+}
+
+# (nombre, tabla, definición) de cada índice
+INDEXES = (
+    ("properties_posting_id_idx", "properties", "(posting_id)"),
+    ("properties_currency_price_idx", "properties", "(currency, price)"),
+    ("properties_location_idx", "properties", "(location)"),
+    ("properties_publication_date_idx", "properties", "(publication_date)"),
+    ("properties_processed_at_idx", "properties", "(processed_at)"),
+    ("properties_content_hash_idx", "properties", "(content_hash)"),
+    ("properties_duplicate_of_idx", "properties", "(duplicate_of)"),
+    ("properties_json_data_idx", "properties", "USING GIN (json_data jsonb_path_ops)"),
+    ("price_history_posting_idx", "price_history", "(posting_id, observed_at)"),
+    ("listing_queue_status_idx", "listing_queue", "(status, available_at)"),
+)
+
+SCHEMA_COLUMNS_SQL = """
+    SELECT table_name, column_name FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = ANY(%s)
+"""
+
+
+def _index_sql(name, table, definition, concurrently=False):
+    return (f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS "
+            f"{name} ON {table} {definition}")
+
+
+def _reconnecting(method):
+    """
+    Reintenta la operación con otra conexión si la que usaba se cortó (ver
+    Database._connection). Los errores de la consulta en sí, incluido el
+    statement_timeout, no se reintentan.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return method(self, *args, **kwargs)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                self._wait_to_reconnect(e, attempt)
+                attempt += 1
+    return wrapper
+
+
+class Database(Storage):
+    """
+    Backend sobre Postgres (psycopg2) con un pool de conexiones compartido
+    entre hilos. Cada operación toma una conexión del pool, hace su propia
+    transacción y la devuelve, así un error no deja abortada la transacción de
+    las demás y varios workers pueden escribir a la vez. Las conexiones que
+    estuvieron ociosas se verifican antes de usarlas y las que se cortan se
+    descartan y se reemplazan.
+    """
+    def __init__(self, db_url, min_connections=None, max_connections=None, statement_timeout=None,
+                 health_check_interval=None, max_attempts=None, check_schema=True):
         if not db_url:
             raise ValueError("La URL de la base de datos no puede estar vacía")
-        
-        self.conn = psycopg2.connect(db_url)
-        self.cursor = self.conn.cursor()
-        self._create_table()
+        if min_connections is None:
+            min_connections = int(os.environ.get("DB_POOL_MIN", 1))
+        if max_connections is None:
+            max_connections = int(os.environ.get("DB_POOL_MAX", max(4, int(os.environ.get("FETCH_WORKERS", 4)))))
+        if statement_timeout is None:
+            statement_timeout = float(os.environ.get("DB_STATEMENT_TIMEOUT", 30))
+        if health_check_interval is None:
+            health_check_interval = float(os.environ.get("DB_HEALTH_CHECK_INTERVAL", 30))
+        if max_attempts is None:
+            max_attempts = int(os.environ.get("DB_MAX_ATTEMPTS", 3))
+
+        self.db_url = db_url
+        self.health_check_interval = health_check_interval
+        self.retry = RetryPolicy(max_attempts=max_attempts, base_delay=1, max_delay=10)
+        # statement_timeout se fija por conexión al abrirla; keepalives detecta
+        # conexiones muertas aunque estén ociosas
+        self.pool = ThreadedConnectionPool(
+            max(1, min_connections), max(1, min_connections, max_connections), db_url,
+            connect_timeout=int(os.environ.get("DB_CONNECT_TIMEOUT", 10)),
+            options=f"-c statement_timeout={int(statement_timeout * 1000)}",
+            keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3,
+        )
+        self._last_used = {}
+        self._last_used_lock = threading.Lock()
+        # El pool de psycopg2 falla si se agota; con el semáforo los hilos de más esperan su turno
+        self._slots = threading.BoundedSemaphore(max(1, min_connections, max_connections))
+        if check_schema:
+            self._create_table()
+
+    def _checkout(self):
+        """Conexión del pool, verificada con un SELECT 1 si estuvo ociosa mucho tiempo."""
+        conn = self.pool.getconn()
+        with self._last_used_lock:
+            last_used = self._last_used.get(id(conn))
+        if conn.closed:
+            self.pool.putconn(conn, close=True)
+            return self.pool.getconn()
+        if last_used is not None and time.monotonic() - last_used > self.health_check_interval:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                self.pool.putconn(conn, close=True)
+                metrics.incr("db_reconnects")
+                return self.pool.getconn()
+        return conn
+
+    def _wait_to_reconnect(self, error, attempt):
+        """Vuelve a lanzar `error` si no es una conexión perdida o se agotaron los intentos; si no, espera."""
+        if not getattr(error, "connection_lost", False) or attempt + 1 >= self.retry.max_attempts:
+            raise error
+        delay = self.retry.delay(attempt)
+        print(f"🔌 Se perdió la conexión con la base ({error.__class__.__name__}). "
+              f"Reconectando en {delay:.1f} s...")
+        metrics.incr("db_reconnects")
+        time.sleep(delay)
+
+    @contextmanager
+    def _connection(self):
+        """
+        Presta una conexión para una operación: confirma al salir bien y
+        deshace si hubo un error. Si la conexión se cortó, la descarta del pool
+        y marca el error con `connection_lost` para que _reconnecting reintente.
+        """
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+        except psycopg2.OperationalError as e:
+            self._slots.release()
+            e.connection_lost = True
+            raise
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException as e:
+            # También GeneratorExit: un iter_properties que se deja a medias
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    conn.rollback()
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    broken = True
+            if broken and isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                e.connection_lost = True
+            raise
+        finally:
+            with self._last_used_lock:
+                if broken:
+                    self._last_used.pop(id(conn), None)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+            self.pool.putconn(conn, close=broken)
+            self._slots.release()
 
+    @_reconnecting
     def _create_table(self):
         """
-        Crea la tabla de propiedades si no existe.
-        Usa tipos de datos compatibles con PostgreSQL.
+        En una base nueva crea las tablas y sus índices (vacías, es instantáneo).
+        En una existente crea las tablas que falten y agrega las columnas
+        tipadas que no estén: son nullable y sin default, así que ADD COLUMN
+        solo toca el catálogo y no reescribe la tabla. Con lock_timeout, si
+        otra transacción larga tiene tomada la tabla se falla enseguida en vez
+        de quedar en la fila del lock frenando las demás consultas. Lo que sí
+        puede tardar (completar las filas viejas y los índices de properties,
+        con CREATE INDEX CONCURRENTLY) queda para migrate.py.
         """
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS properties (
-                id SERIAL PRIMARY KEY,
-                url TEXT NOT NULL UNIQUE,
-                processed_at TIMESTAMP,
-                json_data JSONB
-            )
-        """)
-        self.conn.commit()
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(SCHEMA_COLUMNS_SQL, (list(TABLES),))
+            existing = {}
+            for table, column in cursor.fetchall():
+                existing.setdefault(table, set()).add(column)
 
+            if "properties" not in existing:
+                # El statement_timeout de las consultas comunes no aplica al esquema
+                cursor.execute("SET LOCAL statement_timeout = 0")
+                for statement in TABLES.values():
+                    cursor.execute(statement)
+                for index in INDEXES:
+                    cursor.execute(_index_sql(*index))
+                return
+
+            missing_tables = [table for table in TABLES if table not in existing]
+            missing_columns = [(column, sql_type) for column, sql_type in TYPED_COLUMNS
+                               if column not in existing["properties"]]
+            if not missing_tables and not missing_columns:
+                return
+
+            cursor.execute("SET LOCAL lock_timeout = '5s'")
+            for table in missing_tables:
+                print(f"🗄️ Creando la tabla {table}...")
+                cursor.execute(TABLES[table])
+                # La tabla está vacía: sus índices se crean al instante
+                for index in INDEXES:
+                    if index[1] == table:
+                        cursor.execute(_index_sql(*index))
+            for column, sql_type in missing_columns:
+                print(f"🗄️ Agregando la columna properties.{column}...")
+                cursor.execute(f"ALTER TABLE properties ADD COLUMN IF NOT EXISTS {column} {sql_type}")
+            if missing_columns:
+                print("⚠️ Las filas guardadas antes de esta versión no tienen las columnas nuevas completas "
+                      "ni sus índices: corré `python migrate.py` para completarlas.")
+
+    def migrate_schema(self):
+        """
+        Lleva una base existente al esquema actual: crea las tablas que falten,
+        agrega las columnas tipadas que no estén y crea los índices con CREATE
+        INDEX CONCURRENTLY, que no bloquea las escrituras mientras se construye.
+        CONCURRENTLY no puede correr dentro de una transacción, así que usa una
+        conexión propia en autocommit y sin el statement_timeout del pool. Un índice que quedó inválido por una
+        corrida interrumpida se borra y se vuelve a crear.
+        """
+        # Sin statement_timeout: construir un índice sobre una tabla grande puede tardar minutos
+        conn = psycopg2.connect(self.db_url, connect_timeout=int(os.environ.get("DB_CONNECT_TIMEOUT", 10)),
+                                options="-c statement_timeout=0")
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                for statement in TABLES.values():
+                    cursor.execute(statement)
+
+                cursor.execute(SCHEMA_COLUMNS_SQL, (["properties"],))
+                existing = {column for _, column in cursor.fetchall()}
+                # ADD COLUMN toma un lock exclusivo aunque la columna ya exista
+                for column, sql_type in TYPED_COLUMNS:
+                    if column not in existing:
+                        print(f"🗄️ Agregando la columna properties.{column}...")
+                        cursor.execute(f"ALTER TABLE properties ADD COLUMN IF NOT EXISTS {column} {sql_type}")
+
+                cursor.execute("""
+                    SELECT c.relname, i.indisvalid FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = ANY(%s)
+                """, ([name for name, _, _ in INDEXES],))
+                indexes = dict(cursor.fetchall())
+                for name, table, definition in INDEXES:
+                    if indexes.get(name):
+                        continue
+                    if name in indexes:
+                        print(f"🗄️ El índice {name} quedó inválido; se vuelve a crear.")
+                        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                    print(f"🗄️ Creando el índice {name}...")
+                    cursor.execute(_index_sql(name, table, definition, concurrently=True))
+        finally:
+            conn.close()
+
+    @_reconnecting
     def add_property(self, url, json_structured_info):
         """Añade una nueva propiedad a la base de datos."""
+        row = self._insert_row(url, datetime.datetime.now(), json_structured_info)
+
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO properties ({", ".join(INSERT_COLUMNS)})
+                VALUES ({", ".join(["%s"] * len(INSERT_COLUMNS))})
+            """, row)
+        self._remember([row])
+
+    @metrics.timed("db_insert")
+    @_reconnecting
+    def add_properties(self, batch):
+        """
+        Añade varias propiedades en un solo INSERT y un único commit.
+        `batch` es una lista de tuplas (url, json_structured_info). Las URLs que
+        ya existen se ignoran (ON CONFLICT DO NOTHING), así que reintentar el
+        lote después de un corte no duplica filas.
+        """
+        if not batch:
+            return
         processed_at = datetime.datetime.now()
-        # psycopg2 puede manejar la conversión de dict a JSONB directamente
-        json_data = json.dumps(json_structured_info)
+        rows = [self._insert_row(url, processed_at, info) for url, info in batch]
+
+        with self._connection() as conn, conn.cursor() as cursor:
+            execute_values(cursor, f"""
+                INSERT INTO properties ({", ".join(INSERT_COLUMNS)})
+                VALUES %s
+                ON CONFLICT (url) DO NOTHING
+            """, rows)
+        self._remember(rows)
+
+    @_reconnecting
+    def _load_seen_rows(self, after_id=0):
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, url, posting_id, content_hash, price, minhash, duplicate_of,
+                       currency, surface_total, surface_covered
+                FROM properties WHERE id > %s
+            """, (after_id,))
+            return cursor.fetchall()
 
-        self.cursor.execute("""
-            INSERT INTO properties (url, processed_at, json_data)
-            VALUES (%s, %s, %s)
-        """, (url, processed_at, json_data))
-        self.conn.commit()
+    @metrics.timed("db_check")
+    @_reconnecting
+    def _saved_rows(self, urls, posting_ids):
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT url, posting_id FROM properties WHERE url = ANY(%s)
+                UNION
+                SELECT url, posting_id FROM properties WHERE posting_id = ANY(%s)
+            """, (urls, posting_ids))
+            return cursor.fetchall()
 
-    def property_exists(self, url):
-        """Verifica si una propiedad ya existe en la base de datos por su URL."""
-        self.cursor.execute("SELECT id FROM properties WHERE url = %s", (url,))
-        return self.cursor.fetchone() is not None
+    def iter_properties(self, chunk_size=1000, after_id=0):
+        """
+        Recorre toda la tabla con un cursor del lado del servidor (con nombre), así
+        la memoria no depende de la cantidad de filas. Devuelve listas de hasta
+        `chunk_size` tuplas (id, url, processed_at, json_data), en orden de id.
+        Con `after_id` solo recorre las filas posteriores (exportes incrementales).
+        Si la conexión se corta, sigue con otra desde el último id entregado.
+        """
+        attempt = 0
+        while True:
+            try:
+                with self._connection() as conn, conn.cursor(name="properties_scan") as cursor:
+                    cursor.itersize = chunk_size
+                    cursor.execute(
+                        "SELECT id, url, processed_at, json_data FROM properties WHERE id > %s ORDER BY id",
+                        (after_id,),
+                    )
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            return
+                        after_id = rows[-1][0]
+                        attempt = 0
+                        yield rows
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                self._wait_to_reconnect(e, attempt)
+                attempt += 1
+
+    @metrics.timed("db_check")
+    @_reconnecting
+    def known_listings(self, posting_ids):
+        """
+        Estado guardado de los avisos con esos idAviso, en una sola consulta:
+        {posting_id: (id, url, price, currency, json_data)}.
+        """
+        posting_ids = list(posting_ids)
+        if not posting_ids:
+            return {}
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT posting_id, id, url, price, currency, json_data
+                FROM properties WHERE posting_id = ANY(%s)
+            """, (posting_ids,))
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    @metrics.timed("db_insert")
+    @_reconnecting
+    def record_price_events(self, events):
+        """
+        Agrega los eventos al historial y, para los cambios de precio, actualiza
+        el precio vigente del aviso (columnas tipadas y json_data), todo en un
+        único commit. Cada evento es un dict con posting_id, event ("price" o
+        "relisted"), price, currency, expenses y previous_price. Los cambios de
+        precio traen además price_text, el precio con el formato de Zonaprop
+        ("USD 120.000"), que es el que se guarda en json_data.
+        """
+        if not events:
+            return
+        observed_at = datetime.datetime.now()
+        updates = []
+        for e in events:
+            if e["event"] != "price":
+                continue
+            patch = {"price": e["price_text"], "currency": e.get("currency")}
+            if e.get("expenses") is not None:
+                patch["expenses"] = str(int(e["expenses"]))
+            updates.append((e["posting_id"], e.get("price"), e.get("currency"), json.dumps(patch)))
+
+        with self._connection() as conn, conn.cursor() as cursor:
+            execute_values(cursor, """
+                INSERT INTO price_history (posting_id, observed_at, event, price, currency, expenses, previous_price)
+                VALUES %s
+            """, [
+                (e["posting_id"], observed_at, e["event"], e.get("price"), e.get("currency"),
+                 e.get("expenses"), e.get("previous_price"))
+                for e in events
+            ])
+            if updates:
+                execute_values(cursor, """
+                    UPDATE properties AS p
+                    SET price = v.price::numeric, currency = v.currency, json_data = p.json_data || v.patch::jsonb
+                    FROM (VALUES %s) AS v (posting_id, price, currency, patch)
+                    WHERE p.posting_id = v.posting_id
+                """, updates)
+
+    @_reconnecting
+    def enqueue_listings(self, new_urls):
+        """
+        Encola las URLs de `new_urls` ({url: [nombres de búsqueda]}). Las que ya
+        están en la cola, o ya guardadas en properties (por URL o idAviso, por
+        ejemplo porque un worker las procesó después de que este proceso cargó
+        su índice en memoria), se ignoran. Devuelve cuántas se agregaron.
+        """
+        if not new_urls:
+            return 0
+        with self._connection() as conn, conn.cursor() as cursor:
+            execute_values(cursor, """
+                INSERT INTO listing_queue (url, searches)
+                SELECT v.url, v.searches::jsonb FROM (VALUES %s) AS v (url, searches, posting_id)
+                WHERE NOT EXISTS (SELECT 1 FROM properties p WHERE p.url = v.url)
+                  AND NOT EXISTS (SELECT 1 FROM properties p WHERE p.posting_id = v.posting_id)
+                ON CONFLICT (url) DO NOTHING
+            """, [(url, json.dumps(names), posting_id_from_url(url)) for url, names in new_urls.items()],
+                page_size=len(new_urls))
+            return cursor.rowcount
+
+    @metrics.timed("queue_claim")
+    @_reconnecting
+    def claim_listings(self, worker_id, limit, lease_seconds, max_attempts):
+        """
+        Toma hasta `limit` avisos de la cola para `worker_id` por `lease_seconds`
+        segundos: los pendientes ya disponibles y los de leases vencidos (el
+        worker que los tenía se cayó). Con FOR UPDATE SKIP LOCKED, varios
+        workers pueden pedir a la vez sin bloquearse ni llevarse el mismo aviso.
+        Los que ya usaron `max_attempts` intentos pasan a 'failed'.
+        Devuelve una lista de (id, url, [nombres de búsqueda], intento).
+        """
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE listing_queue SET status = 'failed', last_error = COALESCE(last_error, 'lease vencido')
+                WHERE status = 'leased' AND lease_until < now() AND attempts >= %s
+            """, (max_attempts,))
+            cursor.execute("""
+                UPDATE listing_queue AS q SET
+                    status = 'leased', leased_by = %s, attempts = q.attempts + 1,
+                    lease_until = now() + %s * interval '1 second'
+                WHERE q.id IN (
+                    SELECT id FROM listing_queue
+                    WHERE ((status = 'pending' AND available_at <= now())
+                           OR (status = 'leased' AND lease_until < now()))
+                      AND attempts < %s
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING q.id, q.url, q.searches, q.attempts
+            """, (worker_id, lease_seconds, max_attempts, limit))
+            return sorted(cursor.fetchall())
+
+    @_reconnecting
+    def complete_listings(self, queue_ids):
+        """Saca de la cola los avisos ya procesados."""
+        if not queue_ids:
+            return
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM listing_queue WHERE id = ANY(%s)", (list(queue_ids),))
+
+    @_reconnecting
+    def fail_listing(self, queue_id, error, max_attempts, retry_delay):
+        """
+        Devuelve un aviso a la cola para reintentarlo dentro de `retry_delay`
+        segundos por intento hecho, o lo marca 'failed' si ya usó `max_attempts`.
+        """
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE listing_queue SET
+                    status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                    available_at = now() + attempts * %s * interval '1 second',
+                    leased_by = NULL, lease_until = NULL, last_error = %s
+                WHERE id = %s
+            """, (max_attempts, retry_delay, error, queue_id))
+
+    @_reconnecting
+    def queue_stats(self):
+        """Cantidad de avisos en la cola por estado."""
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT status, count(*) FROM listing_queue GROUP BY status")
+            return dict(cursor.fetchall())
+
+    @_reconnecting
+    def _backfill_batch(self, last_id, batch_size):
+        """Un lote de backfill_typed_columns: devuelve (último id, filas actualizadas), o (None, 0) al terminar."""
+        with self._connection() as conn, conn.cursor() as cursor:
+            # Solo para esta transacción: un lote sobre filas grandes puede pasar el límite del pool
+            cursor.execute("SET LOCAL statement_timeout = 0")
+            cursor.execute("""
+                SELECT id, json_data FROM properties
+                WHERE id > %s ORDER BY id LIMIT %s
+            """, (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return None, 0
+
+            pending = [
+                (row_id,) + self._typed_values(json.loads(data) if isinstance(data, str) else data or {})
+                for row_id, data in rows
+            ]
+            execute_values(cursor, """
+                UPDATE properties AS p SET
+                    posting_id = v.posting_id, price = v.price::numeric, currency = v.currency,
+                    location = v.location, publication_date = v.publication_date::date,
+                    content_hash = v.content_hash, minhash = v.minhash::bigint[], duplicate_of = v.duplicate_of,
+                    surface_total = v.surface_total::numeric, surface_covered = v.surface_covered::numeric
+                FROM (VALUES %s) AS v (id, posting_id, price, currency, location, publication_date, content_hash,
+                                       minhash, duplicate_of, surface_total, surface_covered)
+                WHERE p.id = v.id
+                  AND (p.posting_id, p.price, p.currency, p.location, p.publication_date, p.content_hash,
+                       p.minhash, p.duplicate_of, p.surface_total, p.surface_covered)
+                      IS DISTINCT FROM
+                      (v.posting_id, v.price::numeric, v.currency, v.location, v.publication_date::date, v.content_hash,
+                       v.minhash::bigint[], v.duplicate_of, v.surface_total::numeric, v.surface_covered::numeric)
+            """, pending, page_size=len(pending))
+            return rows[-1][0], cursor.rowcount
+
+    def backfill_typed_columns(self, batch_size=1000):
+        """
+        Completa las columnas tipadas de las filas guardadas antes de la
+        migración. Recorre la tabla por rangos de id y confirma cada lote por
+        separado, así no bloquea la tabla entera ni arma una transacción enorme.
+        Devuelve la cantidad de filas actualizadas.
+        """
+        last_id = 0
+        updated = 0
+        while True:
+            last_id, count = self._backfill_batch(last_id, batch_size)
+            if last_id is None:
+                return updated
+            updated += count
+
+    def rollback(self):
+        """
+        Nada que deshacer: cada operación confirma o deshace su propia
+        transacción (ver _connection). Se mantiene por compatibilidad.
+        """
 
     def close(self):
-        self.conn.close()
+        self.pool.closeall()
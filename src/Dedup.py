@@ -0,0 +1,337 @@
+# src/Dedup.py
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from urllib.parse import urlsplit, urlunsplit
+
+from src.Normalize import parse_amount
+
+# El id del aviso va al final del slug: .../clasificado/veclapin-depto-...-53248711.html
+POSTING_ID_IN_URL = re.compile(r'-(\d+)\.html$')
+
+# Campos que identifican el contenido de un aviso. El precio, las expensas, el
+# id y la fecha quedan afuera: cambian al republicar o al rebajar el precio.
+# El piso solo entra si el aviso lo trae (los campos vacíos no cuentan), así
+# los hashes ya guardados de avisos sin piso siguen siendo comparables.
+#
+# Limitaciones: al no incluir el precio, dos unidades del mismo edificio con
+# los mismos textos y m² (y sin el piso en el aviso ni en la dirección) tienen
+# el mismo hash y la segunda se toma como republicación. Y como la
+# descripción solo está en la página del aviso, el hash se calcula después de
+# descargarlo: no sirve para descartar republicaciones desde la página de
+# resultados, que solo deduplica por URL e idAviso.
+CONTENT_FIELDS = (
+    "title", "description", "address", "location", "property_type",
+    "surface_total", "surface_covered", "bedrooms", "bathrooms", "floor",
+)
+
+# MinHash / LSH para avisos casi iguales (el mismo inmueble publicado por
+# varias inmobiliarias). 64 permutaciones en 16 bandas de 4 filas: dos avisos
+# con similitud 0,6 quedan en la misma cubeta de alguna banda con probabilidad
+# ~0,88, y con similitud 0,3 solo con ~0,12.
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+SHINGLE_WORDS = 3
+MIN_SHINGLES = 8
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.6"))
+# Además de la firma, un casi duplicado tiene que tener la misma moneda y un
+# precio y m² que no difieran en más de esta fracción. El precio y los m² son
+# unos pocos rasgos entre ~100 ternas de la descripción, así que dos unidades
+# del mismo edificio con el mismo texto de la inmobiliaria (USD 150.000 / 70 m²
+# y USD 210.000 / 95 m²) tienen una similitud de ~0,9.
+NEAR_DUPLICATE_TOLERANCE = float(os.getenv("NEAR_DUPLICATE_TOLERANCE", "0.1"))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Semilla fija: las firmas guardadas en la base tienen que seguir siendo comparables
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(MINHASH_PERMUTATIONS)]
+WORD = re.compile(r'\w+')
+
+# Cubetas de LSHIndex: 40 bits de hash de la banda y 24 del número de firma
+# (hasta ~16 millones de avisos). Dos bandas distintas con el mismo hash de 40
+# bits solo agregan un candidato de más, que después se descarta al comparar.
+_SLOT_BITS = 24
+_SLOT_MASK = (1 << _SLOT_BITS) - 1
+_BAND_HASH_MASK = (1 << 40) - 1
+
+# Montos de listing_facts que guarda SeenIndex por firma: precio y los dos m²
+_FACT_COUNT = 3
+NAN = float("nan")
+
+
+def canonical_url(url):
+    """
+    Forma canónica de la URL de un aviso: esquema y host en minúsculas, sin
+    query ni fragmento y sin la extensión duplicada '.html.html'.
+    """
+    parts = urlsplit(url.strip())
+    path = parts.path
+    while path.endswith('.html.html'):
+        path = path[:-len('.html')]
+    return urlunsplit((parts.scheme.lower() or "https", parts.netloc.lower(), path, "", ""))
+
+
+def posting_id_from_url(url):
+    """idAviso tomado de la URL (None si la URL no lo trae)."""
+    match = POSTING_ID_IN_URL.search(canonical_url(url))
+    return match.group(1) if match else None
+
+
+def content_hash(data):
+    """
+    Hash del contenido estable del aviso (ver CONTENT_FIELDS). Dos avisos con el
+    mismo hash y distinto id son el mismo inmueble republicado.
+    """
+    content = {field: data.get(field) for field in CONTENT_FIELDS if data.get(field)}
+    if not content:
+        return None
+    serialized = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+def listing_shingles(data):
+    """
+    Conjunto de rasgos de un aviso para MinHash: ternas de palabras de la
+    descripción y, como rasgos sueltos, el precio redondeado a USD 5.000, las
+    superficies y las palabras de la dirección.
+    """
+    words = WORD.findall((data.get("description") or "").lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    price = parse_amount(data.get("price"))
+    if price:
+        shingles.add(f"price:{data.get('currency')}:{round(price / 5000)}")
+    for field in ("surface_total", "surface_covered"):
+        surface = parse_amount(data.get(field))
+        if surface:
+            shingles.add(f"{field}:{surface:.0f}")
+    shingles.update(f"address:{word}" for word in WORD.findall((data.get("address") or "").lower()))
+    return shingles
+
+
+def listing_facts(data):
+    """
+    (moneda, precio, m² totales, m² cubiertos) de un aviso, para confirmar un
+    casi duplicado (ver SeenIndex.find_near_duplicate). None donde falte.
+    """
+    return (data.get("currency"), parse_amount(data.get("price")),
+            parse_amount(data.get("surface_total")), parse_amount(data.get("surface_covered")))
+
+
+def facts_compatible(first, second, tolerance=NEAR_DUPLICATE_TOLERANCE):
+    """
+    True si dos listing_facts pueden ser del mismo inmueble: misma moneda y
+    precio y m² a menos de `tolerance` (relativa) entre sí. Un dato que falta
+    en alguno de los dos no descarta.
+    """
+    first_currency, *first_amounts = first
+    second_currency, *second_amounts = second
+    if first_currency and second_currency and first_currency != second_currency:
+        return False
+    for a, b in zip(first_amounts, second_amounts):
+        if a is None or b is None or math.isnan(a) or math.isnan(b):
+            continue
+        if abs(a - b) > tolerance * max(abs(a), abs(b)):
+            return False
+    return True
+
+
+def minhash_signature(data):
+    """
+    Firma MinHash (lista de MINHASH_PERMUTATIONS enteros) de un aviso, o None
+    si tiene muy poco texto para compararlo.
+    """
+    shingles = listing_shingles(data)
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+    prime = _MERSENNE_PRIME
+    return [min((a * h + b) % prime for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def signature_similarity(first, second):
+    """Jaccard estimada entre dos firmas: proporción de posiciones iguales."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class LSHIndex:
+    """
+    Índice LSH por bandas sobre firmas MinHash: cada firma se parte en
+    LSH_BANDS bandas y se guarda en una cubeta por banda. Una consulta solo
+    compara contra las firmas que comparten alguna cubeta, no contra todo el
+    historial.
+
+    Cada proceso tiene todo el historial en memoria, así que nada se guarda
+    como objetos de Python por valor: las firmas van una detrás de otra en un
+    único array de enteros de 64 bits (512 bytes por firma) y las cubetas son
+    un array ordenado de enteros con el hash de la banda en los bits altos y
+    el número de firma en los bajos (8 bytes por banda), que se consulta con
+    búsqueda binaria. Lo agregado desde el último reordenamiento queda en un
+    dict (pending) hasta juntar PENDING_LIMIT entradas o un cuarto de las
+    cubetas ordenadas.
+    """
+    PENDING_LIMIT = 4096
+
+    def __init__(self, bands=LSH_BANDS):
+        self.bands = bands
+        self.rows = MINHASH_PERMUTATIONS // bands
+        self.matrix = array("Q")
+        # número de firma -> clave, y al revés
+        self.keys = []
+        self.slots = {}
+        self.buckets = array("Q")
+        # hash de banda -> [números de firma], todavía sin pasar a self.buckets
+        self.pending = {}
+        self.pending_count = 0
+
+    def _band_hashes(self, signature):
+        data = signature.tobytes()
+        width = len(data) // self.bands
+        return [hash((band, data[band * width:(band + 1) * width])) & _BAND_HASH_MASK
+                for band in range(self.bands)]
+
+    def _flush_pending(self):
+        """Pasa las cubetas pendientes al array ordenado."""
+        entries = array("Q", ((band_hash << _SLOT_BITS) | slot
+                              for band_hash, slots in self.pending.items() for slot in slots))
+        self.buckets = array("Q", sorted(self.buckets + entries))
+        self.pending = {}
+        self.pending_count = 0
+
+    def add(self, key, signature):
+        if key in self.slots:
+            return
+        slot = len(self.keys)
+        if slot > _SLOT_MASK:
+            raise OverflowError(f"El índice LSH admite hasta {_SLOT_MASK + 1} firmas.")
+        signature = array("Q", signature)
+        self.keys.append(key)
+        self.slots[key] = slot
+        self.matrix.extend(signature)
+        for band_hash in self._band_hashes(signature):
+            self.pending.setdefault(band_hash, []).append(slot)
+        self.pending_count += self.bands
+        # El límite crece con el índice, así reordenar cuesta O(1) amortizado por firma
+        if self.pending_count >= max(self.PENDING_LIMIT, len(self.buckets) // 4):
+            self._flush_pending()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def signature(self, key):
+        """Firma guardada para `key`, como array de enteros."""
+        slot = self.slots[key]
+        return self.matrix[slot * MINHASH_PERMUTATIONS:(slot + 1) * MINHASH_PERMUTATIONS]
+
+    def query(self, signature, threshold=NEAR_DUPLICATE_THRESHOLD):
+        """Claves con similitud estimada >= threshold, como (similitud, clave), de mayor a menor."""
+        signature = array("Q", signature)
+        buckets = self.buckets
+        candidates = set()
+        for band_hash in self._band_hashes(signature):
+            position = bisect_left(buckets, band_hash << _SLOT_BITS)
+            end = bisect_left(buckets, (band_hash + 1) << _SLOT_BITS, position)
+            candidates.update(buckets[i] & _SLOT_MASK for i in range(position, end))
+            candidates.update(self.pending.get(band_hash, ()))
+        matches = []
+        for slot in candidates:
+            stored = self.matrix[slot * MINHASH_PERMUTATIONS:(slot + 1) * MINHASH_PERMUTATIONS]
+            similarity = signature_similarity(signature, stored)
+            if similarity >= threshold:
+                matches.append((similarity, self.keys[slot]))
+        return sorted(matches, key=lambda match: match[0], reverse=True)
+
+
+class SeenIndex:
+    """
+    Conjunto en memoria de los avisos ya guardados: URLs canónicas, ids de aviso
+    y hashes de contenido (con el último precio visto). Se carga una vez desde la
+    base y se mantiene al día con lo que se va guardando, así que decidir si una
+    URL es nueva no requiere ir a la base.
+    """
+    def __init__(self):
+        self.urls = set()
+        self.posting_ids = set()
+        self.prices_by_hash = {}
+        self.near = LSHIndex()
+        # Moneda, precio y m² de cada firma, por número de firma de self.near
+        # (NaN donde falta): arrays de floats y no tuplas, como las firmas
+        self.currencies = []
+        self.amounts = array("d")
+        # idAviso -> idAviso del primer aviso de su grupo de duplicados
+        self.groups = {}
+
+    def add(self, url, posting_id=None, content_hash=None, price=None, signature=None, duplicate_of=None,
+            facts=None):
+        self.urls.add(canonical_url(url))
+        posting_id = posting_id or posting_id_from_url(url)
+        if posting_id:
+            posting_id = str(posting_id)
+            self.posting_ids.add(posting_id)
+            if signature:
+                if posting_id not in self.near.slots:
+                    currency, *amounts = facts or (None, None, None, None)
+                    self.near.add(posting_id, signature)
+                    self.currencies.append(sys.intern(currency) if currency else None)
+                    self.amounts.extend(NAN if amount is None else float(amount) for amount in amounts)
+                self.groups[posting_id] = duplicate_of or posting_id
+        if content_hash:
+            self.prices_by_hash[content_hash] = price
+
+    def __contains__(self, url):
+        url = canonical_url(url)
+        if url in self.urls:
+            return True
+        posting_id = posting_id_from_url(url)
+        return posting_id is not None and posting_id in self.posting_ids
+
+    def __len__(self):
+        return len(self.urls)
+
+    def filter_new(self, urls):
+        """
+        Devuelve las URLs canónicas que todavía no se vieron, en orden y sin
+        repetir el mismo aviso aunque aparezca con URLs distintas.
+        """
+        new_urls = []
+        batch = SeenIndex()
+        for url in urls:
+            if url in self or url in batch:
+                continue
+            batch.add(url)
+            new_urls.append(canonical_url(url))
+        return new_urls
+
+    def find_relisting(self, content_hash):
+        """
+        Si ya se guardó un aviso con el mismo contenido, devuelve (True, precio
+        anterior); si no, (False, None).
+        """
+        if content_hash and content_hash in self.prices_by_hash:
+            return True, self.prices_by_hash[content_hash]
+        return False, None
+
+    def facts(self, posting_id):
+        """listing_facts guardados para la firma de `posting_id` (NaN donde falta)."""
+        slot = self.near.slots[posting_id]
+        return (self.currencies[slot], *self.amounts[slot * _FACT_COUNT:(slot + 1) * _FACT_COUNT])
+
+    def find_near_duplicate(self, signature, facts=None, threshold=NEAR_DUPLICATE_THRESHOLD):
+        """
+        Si hay un aviso guardado casi igual (firma MinHash con similitud >=
+        threshold y, si se pasan sus listing_facts, precio y m² compatibles),
+        devuelve (idAviso del grupo, similitud); si no, (None, None).
+        """
+        if not signature:
+            return None, None
+        for similarity, posting_id in self.near.query(signature, threshold):
+            if facts is None or facts_compatible(facts, self.facts(posting_id)):
+                return self.groups.get(posting_id, posting_id), similarity
+        return None, None
@@ -0,0 +1,123 @@
+# src/Export.py
+import datetime
+import json
+import os
+import uuid
+from src.Normalize import COLUMNS, normalize_property
+
+
+# Cada exportación vuelve a leer también las últimas filas ya exportadas, como
+# refresh_seen: los ids se asignan al insertar pero las transacciones pueden
+# confirmarse en otro orden, así que una fila puede aparecer después de que se
+# exportaron otras con id mayor. Las que ya se exportaron se descartan por id.
+EXPORT_OVERLAP = 1000
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Para exportar a Parquet hay que instalar pyarrow (pip install pyarrow).")
+    return pyarrow, pyarrow.parquet
+
+
+class ParquetExporter:
+    """
+    Escribe las propiedades normalizadas en archivos Parquet particionados por
+    fecha de procesamiento (processed_date=AAAA-MM-DD/part-*.parquet), de a
+    bloques. Recuerda hasta qué id exportó (y qué ids exportó cerca de esa
+    marca) para que la próxima corrida solo agregue las filas nuevas.
+    """
+    WATERMARK_FILE = "_watermark.json"
+
+    def __init__(self, output_dir):
+        self.pa, self.pq = _import_pyarrow()
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.schema = self.pa.schema([
+            ("posting_id", self.pa.string()),
+            ("url", self.pa.string()),
+            ("processed_at", self.pa.timestamp("us")),
+            ("publication_date", self.pa.date32()),
+            ("price", self.pa.float64()),
+            ("currency", self.pa.string()),
+            ("expenses", self.pa.float64()),
+            ("surface_covered", self.pa.float64()),
+            ("surface_total", self.pa.float64()),
+            ("bedrooms", self.pa.int32()),
+            ("bathrooms", self.pa.int32()),
+            ("age", self.pa.int32()),
+            ("location", self.pa.string()),
+            ("property_type", self.pa.string()),
+            ("address", self.pa.string()),
+        ])
+        if tuple(self.schema.names) != COLUMNS:
+            raise ValueError(f"El esquema de Parquet no coincide con las columnas normalizadas: "
+                             f"{tuple(self.schema.names)} != {COLUMNS}")
+        self._last_id, self._recent_ids = self._load_watermark()
+
+    @property
+    def _watermark_path(self):
+        return os.path.join(self.output_dir, self.WATERMARK_FILE)
+
+    def _load_watermark(self):
+        try:
+            with open(self._watermark_path, encoding="utf-8") as f:
+                watermark = json.load(f)
+            return watermark["last_id"], set(watermark.get("recent_ids", ()))
+        except (FileNotFoundError, KeyError, ValueError):
+            return 0, set()
+
+    def last_exported_id(self):
+        """Id de la última fila exportada (0 si nunca se exportó)."""
+        return self._last_id
+
+    def resume_after_id(self):
+        """
+        Id desde el que tiene que leer la próxima exportación: la marca menos
+        EXPORT_OVERLAP, para recuperar las filas que se confirmaron tarde.
+        """
+        return max(0, self._last_id - EXPORT_OVERLAP)
+
+    def reset_watermark(self):
+        """Olvida lo exportado, para volver a exportar todo (--full)."""
+        self._last_id, self._recent_ids = 0, set()
+
+    def _save_watermark(self):
+        tmp_path = self._watermark_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"last_id": self._last_id, "recent_ids": sorted(self._recent_ids)}, f)
+        os.replace(tmp_path, self._watermark_path)
+
+    def write_chunk(self, rows):
+        """
+        Normaliza y escribe un bloque de filas (id, url, processed_at, json_data),
+        salvo las que ya se exportaron. Devuelve la cantidad de filas escritas.
+        """
+        rows = [row for row in rows if row[0] not in self._recent_ids]
+        if not rows:
+            return 0
+
+        by_date = {}
+        for _, url, processed_at, data in rows:
+            if isinstance(data, str):
+                data = json.loads(data)
+            record = normalize_property(data, url=url, processed_at=processed_at)
+            date = processed_at.date().isoformat() if processed_at else "unknown"
+            by_date.setdefault(date, []).append(record)
+
+        for date, records in by_date.items():
+            partition = os.path.join(self.output_dir, f"processed_date={date}")
+            os.makedirs(partition, exist_ok=True)
+            columns = {name: [record[name] for record in records] for name in COLUMNS}
+            table = self.pa.Table.from_pydict(columns, schema=self.schema)
+            stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+            self.pq.write_table(table, os.path.join(partition, f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet"))
+
+        # Se avanza la marca recién cuando el bloque quedó escrito
+        self._last_id = max(self._last_id, rows[-1][0])
+        self._recent_ids.update(row[0] for row in rows)
+        self._recent_ids = {row_id for row_id in self._recent_ids if row_id > self._last_id - EXPORT_OVERLAP}
+        self._save_watermark()
+        return len(rows)
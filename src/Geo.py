@@ -0,0 +1,161 @@
+# src/Geo.py
+import json
+import math
+import os
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Trazado de avenidas y estaciones de subte que viene con el repo (ver el
+# campo "description" del archivo: es aproximado). GEO_DATA_PATH lo reemplaza
+# por otro GeoJSON con la misma forma, por ejemplo uno oficial de calles.
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "caba_avenidas.geojson")
+
+# Proyección equirectangular centrada en CABA: a esta escala el error es
+# menor al 0,1% y las distancias quedan en metros con aritmética simple.
+ORIGIN_LAT = -34.61
+ORIGIN_LON = -58.44
+METERS_PER_DEG_LAT = 110_950.0
+METERS_PER_DEG_LON = 111_320.0 * math.cos(math.radians(ORIGIN_LAT))
+
+# Coordenadas aceptadas como de CABA (con margen); el resto se descarta.
+CABA_BOUNDS = (-34.75, -58.56, -34.50, -58.33)
+
+CELL_SIZE_M = 250.0
+
+
+def project(lat: float, lon: float) -> Tuple[float, float]:
+    """(lat, lon) en grados -> (x, y) en metros respecto del origen."""
+    return (lon - ORIGIN_LON) * METERS_PER_DEG_LON, (lat - ORIGIN_LAT) * METERS_PER_DEG_LAT
+
+
+def coordinates_from(data: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """
+    (lat, lon) de un aviso a partir de los campos 'latitude' / 'longitude' que
+    deja structured_attributes, o None si faltan o caen fuera de CABA.
+    """
+    try:
+        lat = float(data["latitude"])
+        lon = float(data["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    min_lat, min_lon, max_lat, max_lon = CABA_BOUNDS
+    if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+        return None
+    return lat, lon
+
+
+def _segment_distance(px, py, x1, y1, x2, y2):
+    dx, dy = x2 - x1, y2 - y1
+    length_sq = dx * dx + dy * dy
+    if length_sq:
+        t = ((px - x1) * dx + (py - y1) * dy) / length_sq
+        if t < 0:
+            t = 0.0
+        elif t > 1:
+            t = 1.0
+        x1 += t * dx
+        y1 += t * dy
+    return math.hypot(px - x1, py - y1)
+
+
+class GeoIndex:
+    """
+    Índice espacial en una grilla de celdas de CELL_SIZE_M metros. Cada tramo
+    de calle (o estación, como tramo de largo cero) se guarda en las celdas que
+    toca su rectángulo envolvente; una consulta solo mira las celdas dentro
+    del radio pedido, así que cuesta unos pocos tramos por aviso.
+    """
+    def __init__(self, cell_size: float = CELL_SIZE_M) -> None:
+        self.cell_size = cell_size
+        # kind -> celda -> [(x1, y1, x2, y2, nombre)]
+        self.cells: Dict[str, Dict[Tuple[int, int], list]] = defaultdict(lambda: defaultdict(list))
+        self.features = 0
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def add_segment(self, kind: str, name: str, start, end) -> None:
+        """Agrega un tramo entre dos puntos (lat, lon)."""
+        x1, y1 = project(*start)
+        x2, y2 = project(*end)
+        cx1, cy1 = self._cell(min(x1, x2), min(y1, y2))
+        cx2, cy2 = self._cell(max(x1, x2), max(y1, y2))
+        segment = (x1, y1, x2, y2, name)
+        grid = self.cells[kind]
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                grid[(cx, cy)].append(segment)
+
+    def add_feature(self, feature: Dict[str, Any], default_kind: str = "avenue") -> None:
+        """Agrega un Feature GeoJSON (Point, LineString o MultiLineString)."""
+        properties = feature.get("properties") or {}
+        geometry = feature.get("geometry") or {}
+        kind = properties.get("kind", default_kind)
+        name = properties.get("name", "")
+        coordinates = geometry.get("coordinates") or []
+        if geometry.get("type") == "Point":
+            lines = [[coordinates, coordinates]]
+        elif geometry.get("type") == "LineString":
+            lines = [coordinates]
+        elif geometry.get("type") == "MultiLineString":
+            lines = coordinates
+        else:
+            return
+        for line in lines:
+            # GeoJSON guarda [lon, lat]
+            points = [(lat, lon) for lon, lat in (point[:2] for point in line)]
+            for start, end in zip(points, points[1:]):
+                self.add_segment(kind, name, start, end)
+        self.features += 1
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "GeoIndex":
+        """Arma el índice a partir de un FeatureCollection GeoJSON."""
+        with open(path or DEFAULT_DATA_PATH, encoding="utf-8") as f:
+            collection = json.load(f)
+        index = cls()
+        for feature in collection.get("features", []):
+            index.add_feature(feature)
+        return index
+
+    def within(self, lat: float, lon: float, radius: float, kind: str = "avenue") -> List[Tuple[float, str]]:
+        """
+        Elementos de tipo `kind` a menos de `radius` metros del punto, como
+        (distancia en metros, nombre), del más cercano al más lejano.
+        """
+        grid = self.cells.get(kind)
+        if not grid:
+            return []
+        px, py = project(lat, lon)
+        cx1, cy1 = self._cell(px - radius, py - radius)
+        cx2, cy2 = self._cell(px + radius, py + radius)
+        best: Dict[str, float] = {}
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                for x1, y1, x2, y2, name in grid.get((cx, cy), ()):
+                    distance = _segment_distance(px, py, x1, y1, x2, y2)
+                    if distance <= radius and distance < best.get(name, math.inf):
+                        best[name] = distance
+        return sorted((distance, name) for name, distance in best.items())
+
+    def nearest(self, lat: float, lon: float, max_distance: float, kind: str = "avenue",
+                accept: Optional[Callable[[str], bool]] = None) -> Optional[Tuple[float, str]]:
+        """
+        El elemento de tipo `kind` más cercano dentro de `max_distance` metros, o
+        None. Con `accept`, solo cuentan los elementos cuyo nombre acepta.
+        """
+        for distance, name in self.within(lat, lon, max_distance, kind):
+            if accept is None or accept(name):
+                return distance, name
+        return None
+
+
+_default_index: Optional[GeoIndex] = None
+
+
+def default_index() -> GeoIndex:
+    """Índice con el GeoJSON de GEO_DATA_PATH (o el que viene con el repo), cargado una sola vez."""
+    global _default_index
+    if _default_index is None:
+        _default_index = GeoIndex.load(os.getenv("GEO_DATA_PATH") or None)
+    return _default_index
@@ -0,0 +1,260 @@
+# src/JsParser.py
+import re
+from typing import Any, Tuple
+
+
+class JsParseError(ValueError):
+    """Error al interpretar un literal de objeto JavaScript."""
+
+
+# Fragmentos comunes de las regex: espacios y comentarios (sin cuantificadores
+# anidados ambiguos, para que un match fallido no retroceda exponencialmente)
+# y strings con comillas simples o dobles.
+_WS = r'\s*(?:(?://[^\n]*|/\*.*?\*/)\s*)*'
+_SINGLE = r"'(?P<{}>[^'\\]*(?:\\.[^'\\]*)*)'"
+_DOUBLE = r'"(?P<{}>[^"\\]*(?:\\.[^"\\]*)*)"'
+
+# Espacios y comentarios seguidos del próximo token, en un solo match: así cada
+# valor cuesta una llamada a la regex en lugar de una para saltar espacios y
+# otra para reconocerlo. El grupo del token indica de qué tipo es.
+_TOKEN = re.compile(rf"""
+    {_WS}
+    (?:
+        {_SINGLE.format('single')}
+      | {_DOUBLE.format('double')}
+      | (?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_$][\w$]*)
+      | (?P<punct>[{{}}\[\]:,`])
+    )?
+""", re.VERBOSE | re.DOTALL)
+# Atajo para el caso más común dentro de un objeto, `clave: escalar,`, en un
+# solo match. Si el valor es un objeto, una lista u otra cosa, no coincide y
+# parse_object sigue token por token.
+_MEMBER = re.compile(rf"""
+    {_WS}
+    (?: {_SINGLE.format('single_key')} | {_DOUBLE.format('double_key')} | (?P<key>[A-Za-z_$][\w$]*|\d+) )
+    {_WS} : {_WS}
+    (?:
+        {_SINGLE.format('single')}
+      | {_DOUBLE.format('double')}
+      | (?P<keyword>true|false|null|undefined)(?![\w$])
+      | (?P<integer>-?\d+)(?![\w$.eE])
+    )
+    {_WS} (?:,|(?=}}))
+""", re.VERBOSE | re.DOTALL)
+_SKIP = re.compile(_WS, re.DOTALL)
+_ESCAPE = re.compile(r'\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\r\n|.)', re.DOTALL)
+
+_SIMPLE_ESCAPES = {
+    'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0',
+    '\n': '', '\r\n': '',  # continuación de línea
+}
+_KEYWORDS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+
+
+def _unescape_match(match: 're.Match') -> str:
+    escape = match.group(1)
+    if escape in _SIMPLE_ESCAPES:
+        return _SIMPLE_ESCAPES[escape]
+    if escape.startswith('u{'):
+        return chr(int(escape[2:-1], 16))
+    if escape[0] in 'ux' and len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    return escape
+
+
+def _unescape(body: str) -> str:
+    if '\\' not in body:
+        return body
+    return _ESCAPE.sub(_unescape_match, body)
+
+
+class _JsObjectParser:
+    """
+    Parser recursivo de una sola pasada para literales de objeto JS: claves sin
+    comillas, strings con comillas simples o template literals, comas finales y
+    comentarios. Cada token se reconoce con un único match de _TOKEN, que
+    también salta los espacios y comentarios que lo preceden.
+    """
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def error(self, message: str, pos: int) -> JsParseError:
+        pos = _SKIP.match(self.text, pos).end()
+        snippet = self.text[pos:pos + 30]
+        return JsParseError(f"{message} en la posición {pos}: {snippet!r}")
+
+    def parse_value(self, pos: int) -> Tuple[Any, int]:
+        match = _TOKEN.match(self.text, pos)
+        kind = match.lastgroup
+        if kind == 'single' or kind == 'double':
+            return _unescape(match.group(kind)), match.end()
+        if kind == 'punct':
+            char = match.group(kind)
+            if char == '{':
+                return self.parse_object(match.end())
+            if char == '[':
+                return self.parse_array(match.end())
+            if char == '`':
+                return self.parse_template(match.end() - 1)
+        elif kind == 'number':
+            number = match.group(kind)
+            is_float = '.' in number or 'e' in number or 'E' in number
+            return (float(number) if is_float else int(number)), match.end()
+        elif kind == 'name':
+            name = match.group(kind)
+            if name in _KEYWORDS:
+                return _KEYWORDS[name], match.end()
+        elif match.end() >= len(self.text):
+            raise self.error("Fin de texto inesperado", pos)
+
+        # Cualquier otra expresión (llamadas a funciones, variables, etc.)
+        # se conserva como texto crudo hasta el próximo separador.
+        return self.parse_raw_expression(match.start(kind) if kind else match.end())
+
+    def parse_key(self, match: 're.Match', pos: int) -> str:
+        kind = match.lastgroup
+        if kind == 'single' or kind == 'double':
+            return _unescape(match.group(kind))
+        if kind == 'name' or kind == 'number':
+            return match.group(kind)
+        raise self.error("Clave inválida", pos)
+
+    def parse_object(self, pos: int) -> Tuple[dict, int]:
+        text = self.text
+        token = _TOKEN.match
+        member = _MEMBER.match
+        result = {}
+        while True:
+            match = member(text, pos)
+            if match:
+                single_key, double_key, key, single, double, keyword, integer = match.groups()
+                key = key or _unescape(single_key if single_key is not None else double_key)
+                if single is not None:
+                    result[key] = _unescape(single)
+                elif double is not None:
+                    result[key] = _unescape(double)
+                elif keyword:
+                    result[key] = _KEYWORDS[keyword]
+                else:
+                    result[key] = int(integer)
+                pos = match.end()
+                continue
+
+            match = token(text, pos)
+            if match.lastgroup == 'punct' and match.group('punct') == '}':
+                return result, match.end()
+            if match.lastgroup is None:
+                raise self.error("Objeto sin cerrar" if match.end() >= len(text) else "Clave inválida", pos)
+
+            key = self.parse_key(match, pos)
+            pos = match.end()
+            match = token(text, pos)
+            if match.group('punct') != ':':
+                raise self.error("Se esperaba ':'", pos)
+            result[key], pos = self.parse_value(match.end())
+
+            match = token(text, pos)
+            separator = match.group('punct')
+            if separator == ',':
+                pos = match.end()
+            elif separator != '}':
+                raise self.error("Se esperaba ',' o '}'", pos)
+
+    def parse_array(self, pos: int) -> Tuple[list, int]:
+        text = self.text
+        token = _TOKEN.match
+        result = []
+        while True:
+            match = token(text, pos)
+            if match.group('punct') == ']':
+                return result, match.end()
+            if match.lastgroup is None and match.end() >= len(text):
+                raise self.error("Lista sin cerrar", pos)
+
+            value, pos = self.parse_value(pos)
+            result.append(value)
+
+            match = token(text, pos)
+            separator = match.group('punct')
+            if separator == ',':
+                pos = match.end()
+            elif separator != ']':
+                raise self.error("Se esperaba ',' o ']'", pos)
+
+    def template_end(self, pos: int) -> int:
+        """Posición siguiente al template literal que empieza en `pos`, incluidas sus ${...} anidadas."""
+        text = self.text
+        pos += 1
+        while pos < len(text):
+            char = text[pos]
+            if char == '\\':
+                pos += 2
+                continue
+            if char == '`':
+                return pos + 1
+            if char == '$' and text[pos + 1:pos + 2] == '{':
+                _, pos = self.parse_raw_expression(pos + 2, closer='}')
+                pos += 1
+                continue
+            pos += 1
+        raise self.error("Template literal sin cerrar", pos)
+
+    def parse_template(self, pos: int) -> Tuple[str, int]:
+        """
+        Un template literal sin ${...} es un string común; uno con
+        sustituciones no se puede evaluar y se conserva como texto crudo.
+        """
+        end = self.template_end(pos)
+        body = self.text[pos + 1:end - 1]
+        if '${' in body:
+            return self.parse_raw_expression(pos)
+        return _unescape(body), end
+
+    def parse_raw_expression(self, pos: int, closer: str = None) -> Tuple[str, int]:
+        """
+        Texto crudo de una expresión hasta el próximo separador del nivel
+        actual (',', ';' o un cierre). Con `closer`, termina en ese cierre.
+        """
+        text = self.text
+        start = pos
+        depth = 0
+        while pos < len(text):
+            char = text[pos]
+            if char == '"' or char == "'":
+                match = _TOKEN.match(text, pos)
+                if match.lastgroup not in ('single', 'double'):
+                    raise self.error("String sin cerrar", pos)
+                pos = match.end()
+                continue
+            if char == '`':
+                pos = self.template_end(pos)
+                continue
+            if char in '([{':
+                depth += 1
+            elif char in ')]}':
+                if depth == 0:
+                    break
+                depth -= 1
+            elif char in ',;' and depth == 0 and closer is None:
+                break
+            pos += 1
+
+        raw = text[start:pos].strip()
+        if not raw and closer is None:
+            raise self.error("Valor vacío", start)
+        return raw, pos
+
+
+def parse_js_value(text: str, pos: int = 0) -> Tuple[Any, int]:
+    """
+    Interpreta el literal JS (objeto, lista, string, número...) que empieza en
+    `pos` y devuelve (valor, posición donde terminó).
+    """
+    return _JsObjectParser(text).parse_value(pos)
+
+
+def parse_js_object(text: str) -> Any:
+    """Interpreta un literal de objeto JS completo y devuelve el dict equivalente."""
+    value, _ = parse_js_value(text)
+    return value
@@ -0,0 +1,196 @@
+# src/Metrics.py
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Metrics:
+    """
+    Contadores y tiempos por etapa del scraping (descarga de la búsqueda, de
+    cada aviso, parseo, base, Checker, Telegram...). Es seguro para usar desde
+    varios hilos. Los valores son acumulados; `emit` pasa a los sinks además la
+    diferencia desde la emisión anterior (lo que pasó en el último ciclo).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timings = {}   # etapa -> [cantidad, segundos totales, máximo]
+        self._last_emitted = None
+        self.sinks = []
+
+    def incr(self, name, value=1):
+        """Suma `value` al contador `name`."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, stage, seconds):
+        """Registra una duración de la etapa `stage`."""
+        with self._lock:
+            timing = self._timings.get(stage)
+            if timing is None:
+                self._timings[stage] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                if seconds > timing[2]:
+                    timing[2] = seconds
+
+    @contextmanager
+    def timer(self, stage):
+        """Mide lo que tarda el bloque `with` y lo registra en `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        """Decorador: mide cada llamada a la función y la registra en `stage`."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Valores acumulados: {"counters": {...}, "timings": {etapa: {count, seconds, max_seconds}}}."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timings": {
+                    stage: {"count": count, "seconds": total, "max_seconds": maximum}
+                    for stage, (count, total, maximum) in self._timings.items()
+                },
+            }
+
+    @staticmethod
+    def _delta(current, previous):
+        """Diferencia entre dos snapshots: cantidades y segundos del período."""
+        previous = previous or {"counters": {}, "timings": {}}
+        counters = {
+            name: value - previous["counters"].get(name, 0)
+            for name, value in current["counters"].items()
+        }
+        timings = {}
+        for stage, timing in current["timings"].items():
+            before = previous["timings"].get(stage, {"count": 0, "seconds": 0.0})
+            count = timing["count"] - before["count"]
+            if count:
+                timings[stage] = {"count": count, "seconds": timing["seconds"] - before["seconds"]}
+        return {"counters": {k: v for k, v in counters.items() if v}, "timings": timings}
+
+    def emit(self, **labels):
+        """Pasa el estado actual a todos los sinks (por ejemplo, al final de cada ciclo)."""
+        current = self.snapshot()
+        delta = self._delta(current, self._last_emitted)
+        self._last_emitted = current
+        for sink in self.sinks:
+            try:
+                sink.write(current, delta, labels)
+            except Exception as e:
+                # Un sink con problemas no interrumpe el scraping
+                print(f"⚠️ Error escribiendo métricas en {type(sink).__name__}: {e!r}")
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        self.sinks = []
+
+
+class JsonLinesSink:
+    """Agrega una línea JSON por emisión con lo ocurrido desde la anterior (por ciclo)."""
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, snapshot, delta, labels):
+        record = {"time": datetime.datetime.now().isoformat(timespec="seconds"), **labels, **delta}
+        for timing in record["timings"].values():
+            timing["seconds"] = round(timing["seconds"], 4)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        pass
+
+
+class PrometheusSink:
+    """
+    Expone las métricas acumuladas en formato de texto de Prometheus en
+    http://<host>:<port>/metrics, desde un hilo propio.
+    """
+    PREFIX = "zonaprop_"
+
+    def __init__(self, metrics, port, host="0.0.0.0"):
+        self.metrics = metrics
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+
+    def render(self):
+        snapshot = self.metrics.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{self.PREFIX}{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        stage_metric = f"{self.PREFIX}stage_seconds"
+        if snapshot["timings"]:
+            lines.append(f"# TYPE {stage_metric} summary")
+        for stage, timing in sorted(snapshot["timings"].items()):
+            lines.append(f'{stage_metric}_count{{stage="{stage}"}} {timing["count"]}')
+            lines.append(f'{stage_metric}_sum{{stage="{stage}"}} {timing["seconds"]:.6f}')
+        if snapshot["timings"]:
+            lines.append(f"# TYPE {self.PREFIX}stage_max_seconds gauge")
+        for stage, timing in sorted(snapshot["timings"].items()):
+            lines.append(f'{self.PREFIX}stage_max_seconds{{stage="{stage}"}} {timing["max_seconds"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, snapshot, delta, labels):
+        # Prometheus lee los valores cuando los pide; no hay nada que escribir
+        pass
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Registro único del proceso: los módulos importan `metrics` y lo usan directamente
+metrics = Metrics()
+
+
+def configure_from_env():
+    """
+    Agrega los sinks configurados por entorno: METRICS_JSONL (archivo JSON-lines)
+    y METRICS_PORT (endpoint /metrics para Prometheus).
+    """
+    path = os.environ.get("METRICS_JSONL")
+    if path:
+        metrics.sinks.append(JsonLinesSink(path))
+    port = os.environ.get("METRICS_PORT")
+    if port:
+        metrics.sinks.append(PrometheusSink(metrics, int(port)))
+        print(f"📈 Métricas en http://0.0.0.0:{port}/metrics")
+    return metrics
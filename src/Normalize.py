@@ -0,0 +1,88 @@
+# src/Normalize.py
+import datetime
+import re
+from typing import Any, Dict, Optional
+from src.Rules import ListingFacts
+
+NUMBER = re.compile(r'\d[\d.,]*')
+
+# Columnas tipadas que se extraen de structured_attributes, en orden
+COLUMNS = (
+    "posting_id", "url", "processed_at", "publication_date",
+    "price", "currency", "expenses",
+    "surface_covered", "surface_total", "bedrooms", "bathrooms", "age",
+    "location", "property_type", "address",
+)
+
+
+def parse_amount(text: Any) -> Optional[float]:
+    """
+    Convierte montos como "USD 120.000", "$ 45.500" o "1.250,50" a número.
+    En Zonaprop el punto separa miles y la coma, decimales.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = NUMBER.search(str(text))
+    if not match:
+        return None
+    number = match.group(0).replace('.', '').replace(',', '.')
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def parse_int(text: Any) -> Optional[int]:
+    amount = parse_amount(text)
+    return int(amount) if amount is not None else None
+
+
+def parse_currency(data: Dict[str, Any]) -> Optional[str]:
+    """Moneda del precio: la informada en pricesData o, si falta, la del texto del precio."""
+    currency = data.get("currency")
+    if currency:
+        return currency
+    price = str(data.get("price") or "")
+    if "USD" in price or "U$S" in price:
+        return "USD"
+    if "$" in price:
+        return "ARS"
+    return None
+
+
+def parse_date(text: Any) -> Optional[datetime.date]:
+    """Fecha de publicación en los formatos que usa Zonaprop (ISO o dd/mm/aaaa)."""
+    if not text:
+        return None
+    text = str(text).strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return datetime.datetime.strptime(text[:10], fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_property(data: Dict[str, Any], url: Optional[str] = None,
+                       processed_at: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+    """Pasa la salida de structured_attributes a columnas tipadas (ver COLUMNS)."""
+    data = data or {}
+    return {
+        "posting_id": data.get("id"),
+        "url": url,
+        "processed_at": processed_at,
+        "publication_date": parse_date(data.get("publication_date")),
+        "price": parse_amount(data.get("price")),
+        "currency": parse_currency(data),
+        "expenses": parse_amount(data.get("expenses")),
+        "surface_covered": parse_amount(data.get("surface_covered")),
+        "surface_total": parse_amount(data.get("surface_total")),
+        "bedrooms": parse_int(data.get("bedrooms")),
+        "bathrooms": parse_int(data.get("bathrooms")),
+        "age": ListingFacts(data).age,
+        "location": data.get("location"),
+        "property_type": data.get("property_type"),
+        "address": data.get("address"),
+    }
@@ -0,0 +1,86 @@
+# src/Pipeline.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+
+class RateLimiter:
+    """
+    Limita la cantidad de requests por segundo hacia cada host.
+    Es seguro para usar desde varios hilos a la vez.
+    """
+    def __init__(self, requests_per_second):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Bloquea hasta que haya un turno libre para el host de la URL."""
+        if not self.min_interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class FetchPipeline:
+    """
+    Etapa de descarga concurrente: baja los avisos en paralelo con un número
+    acotado de workers y los entrega a medida que terminan, para que el parseo,
+    la base de datos y Telegram los consuman sin esperar al resto.
+    """
+    def __init__(self, browser, workers=None, rate_limit=None, fetch=None):
+        """
+        `fetch` es la función que descarga una URL; por defecto, browser.get_text.
+        """
+        if workers is None:
+            workers = int(os.environ.get("FETCH_WORKERS", 4))
+        if rate_limit is None:
+            rate_limit = float(os.environ.get("FETCH_RATE_LIMIT", 2))
+
+        self.browser = browser
+        self.fetch_url = fetch or browser.get_text
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(rate_limit)
+
+    def _fetch_one(self, url):
+        self.rate_limiter.wait(url)
+        return self.fetch_url(url)
+
+    def fetch(self, urls):
+        """
+        Descarga las URLs en paralelo y devuelve (url, html) en orden de llegada.
+        Mantiene como máximo el doble de workers en vuelo, así un consumidor lento
+        no acumula en memoria todo el HTML descargado.
+        """
+        urls = iter(urls)
+        max_in_flight = self.workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+
+            def fill():
+                while len(pending) < max_in_flight:
+                    url = next(urls, None)
+                    if url is None:
+                        return
+                    pending[executor.submit(self._fetch_one, url)] = url
+
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        html = future.result()
+                    except Exception as e:
+                        print(f"⚠️ Error inesperado descargando {url}: {e}")
+                        html = None
+                    yield url, html
+                fill()
@@ -0,0 +1,45 @@
+# src/Profiles.py
+from src.Checker import Checker
+
+# Páginas que aparecen en los resultados pero no son avisos
+EXCLUDED_URL_PARTS = ["help.zonaprop", "terminos-y-condiciones", "politica-de-privacidad"]
+
+
+def is_listing_url(url):
+    """True si la URL es la de un aviso real (y no una página institucional o de ayuda)."""
+    if "/propiedades/clasificado/" not in url:
+        return False
+    return not any(exclude in url for exclude in EXCLUDED_URL_PARTS)
+
+
+def gringo_message(url, data):
+    """Perfil Gringo: no se realizan checks, se notifica directamente con la ficha."""
+    checker = Checker(data)
+    summary = f"🚀 Nuevo aviso!\n\n"
+    summary += f"🔗 URL: {url}\n\n"
+    summary += checker.get_property_ficha()
+    return summary
+
+
+def tero_pec_message(url, data):
+    """Perfil Tero Pec: se corren los checks y solo se notifica si pasa los filtros."""
+    checker = Checker(data)
+    checker.run_all_checks()
+
+    if not (checker.passed_avenue_check() and checker.passed_price_check()):
+        return None # No se notifica si no pasa los filtros
+
+    summary = f"🚀 *Nuevo aviso (Tero Pec)*\n\n"
+    summary += f"🔗 URL: {url}\n\n"
+    summary += "📋 *Ficha técnica:*\n"
+    summary += checker.get_property_ficha() + "\n\n"
+    summary += "🔍 *Resultados de los cheques:*\n"
+    summary += checker.get_summary()
+    return summary
+
+
+# Perfil -> función que arma el mensaje (o devuelve None si no hay que notificar)
+PROFILES = {
+    "gringo": gringo_message,
+    "tero_pec": tero_pec_message,
+}
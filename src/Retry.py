@@ -0,0 +1,123 @@
+# src/Retry.py
+import email.utils
+import os
+import random
+import threading
+import time
+
+
+class RetryPolicy:
+    """
+    Decide si un request fallido se reintenta y cuánto esperar: backoff
+    exponencial con jitter, respeta Retry-After y tiene un presupuesto de
+    reintentos por corrida compartido entre todos los hilos.
+    """
+    # 429 y 5xx transitorios se reintentan; el resto de los 4xx (404, 403...) no
+    RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=60.0, budget=None):
+        if max_attempts is None:
+            max_attempts = int(os.environ.get("HTTP_MAX_ATTEMPTS", 3))
+        if base_delay is None:
+            base_delay = float(os.environ.get("HTTP_RETRY_BASE_DELAY", 2))
+        if budget is None:
+            budget = int(os.environ.get("HTTP_RETRY_BUDGET", 20))
+
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self._retries_used = 0
+        self._lock = threading.Lock()
+
+    def is_retryable(self, status_code=None):
+        """Sin status (timeout, conexión caída) se reintenta; con status, según la tabla."""
+        return status_code is None or status_code in self.RETRYABLE_STATUS
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Convierte un header Retry-After (segundos o fecha HTTP) a segundos."""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    def delay(self, attempt, response=None):
+        """
+        Segundos a esperar antes del reintento número `attempt` (empezando en 0).
+        Si el servidor mandó Retry-After se usa ese valor; si no, "full jitter"
+        sobre un backoff exponencial.
+        """
+        if response is not None:
+            retry_after = self.parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def consume_retry(self):
+        """Descuenta un reintento del presupuesto; devuelve False si ya no quedan."""
+        with self._lock:
+            if self._retries_used >= self.budget:
+                return False
+            self._retries_used += 1
+            return True
+
+    def reset_budget(self):
+        """Reinicia el presupuesto (al comenzar una nueva corrida)."""
+        with self._lock:
+            self._retries_used = 0
+
+
+class CircuitBreaker:
+    """
+    Deja de pegarle a un host que devuelve 403 una y otra vez: después de
+    `failure_threshold` bloqueos seguidos el circuito se abre durante `cooldown`
+    segundos y los requests a ese host fallan en el acto.
+    """
+    def __init__(self, failure_threshold=None, cooldown=None, tripping_status=(403,)):
+        if failure_threshold is None:
+            failure_threshold = int(os.environ.get("HTTP_CIRCUIT_THRESHOLD", 3))
+        if cooldown is None:
+            cooldown = float(os.environ.get("HTTP_CIRCUIT_COOLDOWN", 300))
+
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.tripping_status = set(tripping_status)
+        self._failures = {}
+        self._open_until = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host):
+        """True si se puede hacer un request al host."""
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return True
+            if time.monotonic() >= open_until:
+                # Medio abierto: dejamos pasar un request de prueba
+                del self._open_until[host]
+                self._failures[host] = self.failure_threshold - 1
+                return True
+            return False
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+
+    def record_failure(self, host, status_code):
+        """Registra un error; solo los status de bloqueo cuentan para abrir el circuito."""
+        if status_code not in self.tripping_status:
+            return
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.failure_threshold:
+                self._open_until[host] = time.monotonic() + self.cooldown
+                print(f"⛔ {host} devolvió {status_code} {failures} veces seguidas. "
+                      f"Se pausan los requests por {self.cooldown:.0f} s.")
@@ -0,0 +1,344 @@
+# src/Rules.py
+import json
+import re
+from collections import namedtuple
+from typing import Any, Dict, List, Optional
+
+from src.Geo import coordinates_from, default_index
+
+# Resultado estructurado de un chequeo. `kind` es el tipo de regla que lo produjo.
+CheckResult = namedtuple("CheckResult", ["kind", "name", "status", "details"])
+
+STATUS_ICONS = {"passed": "✅", "failed": "❌", "unknown": "🟡"}
+
+
+def format_result(result: CheckResult) -> str:
+    """Texto de un resultado tal como se muestra en el resumen de Telegram."""
+    return f"{STATUS_ICONS[result.status]} {result.name}: {result.details}"
+
+
+AVENIDAS_PRINCIPALES = [
+    "av.", "avenida", "av:",
+    "del libertador", "corrientes", "córdoba", "santa fe", "rivadavia",
+    "callao", "pueyrredón", "las heras", "coronel díaz", "cabildo", "pueyrredon",
+    "juramento", "congreso", "triunvirato", "de los incas", "álvarez thomas",
+    "forest", "federico lacroze", "gaona", "nazca", "san martín", "san martin",
+    "beiró", "lope de vega", "juan b. justo", "acoyte", "la plata", "directorio",
+    "eva perón", "san juan", "independencia", "belgrano", "entre ríos", "jujuy"
+]
+
+# Especificación declarativa de los chequeos. Se puede reemplazar por un JSON
+# con la misma forma (ver RulePlan.from_file).
+DEFAULT_RULES: Dict[str, Any] = {
+    "age_groups": [
+        {"name": "Nuevo (0-20 años)", "min_age": 0, "max_age": 20, "checks": [
+            {"type": "max_price", "name": "Precio (Max $160k)", "limit": 160000},
+            {"type": "has_feature", "name": "Tiene Gas", "keywords": ["cocina a gas", "gas natural"]},
+            {"type": "elevator_or_first_floor", "name": "Ascensor o 1er Piso",
+             "keywords": ["ascensor"], "features": {"Servicios": ["Ascensor"]}},
+        ]},
+        {"name": "Intermedio (21-50 años)", "min_age": 21, "max_age": 50, "checks": [
+            {"type": "max_price", "name": "Precio (Max $145k)", "limit": 145000},
+            {"type": "not_first_floor", "name": "No es 1er Piso"},
+            {"type": "has_feature", "name": "Luminoso", "keywords": ["luminoso", "mucha luz"]},
+        ]},
+        # El último grupo recibe cualquier antigüedad que no entre en los anteriores
+        {"name": "Viejo (+50 años)", "min_age": 51, "max_age": None, "checks": [
+            {"type": "max_price", "name": "Precio (Max $130k)", "limit": 130000},
+            {"type": "not_first_floor", "name": "No es 1er Piso"},
+            {"type": "has_feature", "name": "Luminoso", "keywords": ["luminoso", "mucha luz"]},
+        ]},
+    ],
+    "unknown_age_group": "Antigüedad desconocida",
+    "common_checks": [
+        {"type": "min_bathrooms", "name": "Baños", "min": 2},
+        {"type": "has_feature", "name": "Balcón o Patio", "keywords": ["balcón", "patio"],
+         "features": {"Ambientes": ["Balcón"]}},
+        {"type": "max_expenses", "name": "Expensas", "limit": 150000},
+        {"type": "not_on_avenue", "name": "No en Avenida", "avenues": AVENIDAS_PRINCIPALES},
+    ],
+}
+
+AGE_IN_DESCRIPTION = re.compile(r'(\d+)\s+años\s+de\s+antigüedad')
+PRICE_NOISE = re.compile(r'[USD\s,.]')
+DIGITS = re.compile(r'\d+')
+
+
+class ListingFacts:
+    """
+    Datos de un aviso ya normalizados para evaluar las reglas. Cada dato se
+    calcula una sola vez: la descripción se pasa a minúsculas una vez y cada
+    palabra clave se busca a lo sumo una vez, aunque la usen varias reglas.
+    """
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data = data
+        self.description = (data.get("description") or "").lower()
+        self._keyword_hits: Dict[str, bool] = {}
+        self.age = self._age()
+        self.price = self._price()
+        self.floor = self._floor()
+        self.coordinates = coordinates_from(data)
+
+    def _age(self) -> Optional[int]:
+        try:
+            # Intenta obtener la antigüedad desde 'main_features'
+            antiquity_data = (self.data.get("main_features") or {}).get("CFT5")
+            if antiquity_data and antiquity_data.get("label") == "antigüedad":
+                return int(antiquity_data.get("value"))
+
+            # Si no, busca en la descripción
+            match = AGE_IN_DESCRIPTION.search(self.description)
+            if match:
+                return int(match.group(1))
+        except (KeyError, ValueError, TypeError, AttributeError):
+            pass
+        return None
+
+    def _price(self) -> Optional[float]:
+        try:
+            price_str = self.data.get("price")
+            if price_str and self.data.get("currency") == "USD":
+                # Eliminar "USD" y puntos de miles, luego convertir a float
+                return float(PRICE_NOISE.sub('', price_str))
+        except (ValueError, TypeError):
+            pass
+        return None
+
+    def _floor(self) -> Optional[int]:
+        floor = self.data.get("floor")
+        if floor is None:
+            return None
+        match = DIGITS.search(str(floor))
+        return int(match.group(0)) if match else None
+
+    def has_any_keyword(self, keywords) -> bool:
+        """True si alguna de las palabras clave aparece en la descripción."""
+        hits = self._keyword_hits
+        for keyword in keywords:
+            hit = hits.get(keyword)
+            if hit is None:
+                hit = hits[keyword] = keyword in self.description
+            if hit:
+                return True
+        return False
+
+    def has_feature(self, group: str, labels: List[str]) -> bool:
+        features = ((self.data.get("general_features") or {}).get(group) or {}).values()
+        return any(isinstance(item, dict) and item.get("label") in labels for item in features)
+
+
+# --- Compiladores de reglas: spec -> función(facts) -> (status, details) ---
+
+def _compile_max_price(spec):
+    limit = spec["limit"]
+
+    def check(facts):
+        if facts.price is None:
+            return "unknown", "No especificado."
+        return ("passed" if facts.price <= limit else "failed"), f"USD ${facts.price:,.0f}."
+    return check
+
+
+def _compile_has_feature(spec):
+    keywords = tuple(k.lower() for k in spec.get("keywords", []))
+    features = spec.get("features", {})
+
+    def check(facts):
+        found = facts.has_any_keyword(keywords) or \
+            any(facts.has_feature(group, labels) for group, labels in features.items())
+        return ("passed", "Sí") if found else ("unknown", "No especificado.")
+    return check
+
+
+def _compile_elevator_or_first_floor(spec):
+    keywords = tuple(k.lower() for k in spec.get("keywords", []))
+    features = spec.get("features", {})
+
+    def check(facts):
+        has_elevator = facts.has_any_keyword(keywords) or \
+            any(facts.has_feature(group, labels) for group, labels in features.items())
+        elevator = 'Sí' if has_elevator else 'No'
+        if facts.floor is None:
+            return "unknown", f"Piso: N/A. Ascensor: {elevator}."
+        passed = has_elevator or facts.floor == 1
+        return ("passed" if passed else "failed"), f"Piso: {facts.floor}. Ascensor: {elevator}."
+    return check
+
+
+def _compile_not_first_floor(spec):
+    def check(facts):
+        if facts.floor is None:
+            return "unknown", "Piso: N/A."
+        return ("passed" if facts.floor != 1 else "failed"), f"Piso: {facts.floor}."
+    return check
+
+
+def _compile_min_bathrooms(spec):
+    minimum = spec["min"]
+
+    def check(facts):
+        try:
+            bathrooms = int(facts.data.get("bathrooms", 0))
+        except (ValueError, TypeError):
+            bathrooms = 0
+        if bathrooms <= 0:
+            return "unknown", "No se pudo determinar la cantidad."
+        return ("passed" if bathrooms >= minimum else "failed"), f"Tiene {bathrooms} baño(s)."
+    return check
+
+
+def _compile_max_expenses(spec):
+    limit = spec["limit"]
+
+    def check(facts):
+        expensas_val = facts.data.get("expenses")
+        try:
+            expensas = int(expensas_val) if expensas_val else None
+        except (ValueError, TypeError):
+            expensas = None
+        if expensas is None:
+            return "unknown", "No especificadas."
+        return ("passed" if expensas < limit else "failed"), f"Son de ${expensas:,}."
+    return check
+
+
+# Avenidas que también son nombre de barrio o de zona. En la dirección solo
+# cuentan como avenida con el prefijo o seguidas de la altura ("Av. Belgrano",
+# "Belgrano 1200"), no como barrio ("Zapiola 1500, Belgrano"). Lo mismo vale
+# para cualquier avenida que coincida con el barrio (`location`) del aviso.
+BARRIOS_CON_NOMBRE_DE_AVENIDA = {"belgrano", "congreso", "san martín", "san martin"}
+AVENUE_PREFIX = re.compile(r'(?<!\w)av(?:enida|\.|:)?\s*$')
+STREET_NUMBER = re.compile(r'\s*\d')
+
+# Las distancias (max_distance_m) se miden contra src/data/caba_avenidas.geojson
+# si no se define GEO_DATA_PATH: un trazado cargado a mano, con un error del
+# orden de 50 a 100 m y solo con las líneas A, B y D del subte. Con ese archivo,
+# un umbral menor a ~100 m no es confiable y `near` con kind "subte" no ve las
+# estaciones de las líneas C, E ni H.
+
+
+def _compile_not_on_avenue(spec):
+    avenues = tuple(a.lower() for a in spec["avenues"])
+    # Palabras completas, no substrings: "belgrano" no matchea "Belgranito" ni
+    # "juramento" a "Juramentos"
+    avenue_names = re.compile('|'.join(
+        r'(?<!\w)' + re.escape(a) + (r'(?!\w)' if a[-1].isalnum() else '') for a in avenues))
+    max_distance = spec.get("max_distance_m")
+
+    def on_avenue(address, location):
+        for match in avenue_names.finditer(address):
+            name = match.group(0)
+            is_barrio = name in BARRIOS_CON_NOMBRE_DE_AVENIDA or re.search(
+                r'(?<!\w)' + re.escape(name) + r'(?!\w)', location)
+            if (not is_barrio or AVENUE_PREFIX.search(address, 0, match.start())
+                    or STREET_NUMBER.match(address, match.end())):
+                return True
+        return False
+
+    def check(facts):
+        if max_distance is not None and facts.coordinates is not None:
+            # Solo las avenidas de `avenues`, con el mismo criterio que la dirección
+            nearest = default_index().nearest(*facts.coordinates, max_distance, kind="avenue",
+                                              accept=lambda name: avenue_names.search(name.lower()) is not None)
+            if nearest is not None:
+                distance, name = nearest
+                return "failed", f"A {distance:.0f} m de {name}."
+            return "passed", f"A más de {max_distance} m de las avenidas indicadas."
+        address = (facts.data.get("address") or "").lower()
+        if not address or address == 'n/a':
+            return "unknown", "Dirección no especificada."
+        is_on_avenue = on_avenue(address, (facts.data.get("location") or "").lower())
+        return ("failed" if is_on_avenue else "passed"), f"Dirección: {facts.data.get('address', 'N/A')}."
+    return check
+
+
+def _compile_near(spec):
+    kind = spec.get("kind", "subte")
+    max_distance = spec["max_distance_m"]
+
+    def check(facts):
+        if facts.coordinates is None:
+            return "unknown", "Sin coordenadas."
+        nearest = default_index().nearest(*facts.coordinates, max_distance, kind=kind)
+        if nearest is None:
+            return "failed", f"Nada a menos de {max_distance} m."
+        distance, name = nearest
+        return "passed", f"A {distance:.0f} m de {name}."
+    return check
+
+
+RULE_COMPILERS = {
+    "max_price": _compile_max_price,
+    "has_feature": _compile_has_feature,
+    "elevator_or_first_floor": _compile_elevator_or_first_floor,
+    "not_first_floor": _compile_not_first_floor,
+    "min_bathrooms": _compile_min_bathrooms,
+    "max_expenses": _compile_max_expenses,
+    "not_on_avenue": _compile_not_on_avenue,
+    "near": _compile_near,
+}
+
+
+class RulePlan:
+    """
+    Plan de evaluación compilado una sola vez a partir de la especificación:
+    cada regla queda como una función que lee los ListingFacts del aviso.
+    Las palabras clave se buscan con `in` (búsqueda en C), que en CPython le
+    gana a una regex con alternativas y a un Aho-Corasick en Python puro.
+    """
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        self.spec = spec
+        self.unknown_age_group = spec.get("unknown_age_group", "Antigüedad desconocida")
+        self.age_groups = [
+            (group["name"], group.get("min_age"), group.get("max_age"), self._compile_checks(group["checks"]))
+            for group in spec["age_groups"]
+        ]
+        self.common_checks = self._compile_checks(spec.get("common_checks", []))
+
+    @staticmethod
+    def _compile_checks(check_specs):
+        compiled = []
+        for check in check_specs:
+            if check["type"] not in RULE_COMPILERS:
+                raise ValueError(f"Tipo de regla desconocido: {check['type']}")
+            compiled.append((check["type"], check["name"], RULE_COMPILERS[check["type"]](check)))
+        return compiled
+
+    def group_for(self, age: Optional[int]):
+        """Devuelve (nombre, chequeos) del grupo de antigüedad que corresponde."""
+        if age is None:
+            return self.unknown_age_group, []
+        for name, min_age, max_age, checks in self.age_groups:
+            if (min_age is None or age >= min_age) and (max_age is None or age <= max_age):
+                return name, checks
+        name, _, _, checks = self.age_groups[-1]
+        return name, checks
+
+    def evaluate(self, data: Dict[str, Any]):
+        """Evalúa un aviso y devuelve (grupo, facts, lista de CheckResult)."""
+        facts = ListingFacts(data)
+        group_name, group_checks = self.group_for(facts.age)
+        results = [
+            CheckResult._make((kind, name) + check(facts))
+            for kind, name, check in (*group_checks, *self.common_checks)
+        ]
+        return group_name, facts, results
+
+    def newly_passed(self, old_data: Dict[str, Any], new_data: Dict[str, Any]) -> List[CheckResult]:
+        """
+        Chequeos que fallaban con `old_data` y pasan con `new_data` (por ejemplo,
+        un precio que bajó por debajo del máximo).
+        """
+        _, _, before = self.evaluate(old_data)
+        _, _, after = self.evaluate(new_data)
+        failed_before = {(r.kind, r.name) for r in before if r.status == "failed"}
+        return [r for r in after if r.status == "passed" and (r.kind, r.name) in failed_before]
+
+    @classmethod
+    def from_file(cls, path: str) -> "RulePlan":
+        """Compila un plan a partir de un archivo JSON con la misma forma que DEFAULT_RULES."""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+
+DEFAULT_PLAN = RulePlan(DEFAULT_RULES)
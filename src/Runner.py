@@ -0,0 +1,404 @@
+# src/Runner.py
+import json
+import os
+import socket
+from src.Scraper import Scraper
+from src.Pipeline import FetchPipeline
+from src.Profiles import PROFILES, is_listing_url
+from src.Normalize import parse_amount
+from src.Rules import DEFAULT_PLAN, format_result
+from src.Dedup import SeenIndex, listing_facts, minhash_signature, posting_id_from_url
+from src.Metrics import metrics
+
+
+# Avisos que se guardan juntos en un INSERT antes de enviar sus notificaciones
+SAVE_BATCH_SIZE = int(os.environ.get("SAVE_BATCH_SIZE", 10))
+
+
+def format_price(amount, currency):
+    """Precio con el formato de Zonaprop ("USD 120.000")."""
+    return f"{currency or ''} {amount:,.0f}".replace(",", ".").strip()
+
+
+class Search:
+    """Una búsqueda guardada: URL de resultados, perfil de checks y chat de destino."""
+    def __init__(self, name, scrape_url, profile, chat_id=None, max_pages=None):
+        if profile not in PROFILES:
+            raise ValueError(f"Perfil desconocido '{profile}' en la búsqueda '{name}'. "
+                             f"Opciones: {', '.join(sorted(PROFILES))}")
+        self.name = name
+        self.scrape_url = scrape_url
+        self.profile = profile
+        self.chat_id = chat_id
+        self.max_pages = max_pages
+
+    @classmethod
+    def from_dict(cls, config):
+        return cls(
+            name=config["name"],
+            scrape_url=config["scrape_url"],
+            profile=config["profile"],
+            chat_id=config.get("chat_id"),
+            max_pages=config.get("max_pages"),
+        )
+
+
+def load_searches(path):
+    """
+    Lee la lista de búsquedas de un archivo JSON o YAML con la forma
+    {"searches": [{"name": ..., "scrape_url": ..., "profile": ..., "chat_id": ...}]}.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yml", ".yaml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Para leer configuraciones YAML hay que instalar PyYAML (pip install pyyaml).")
+            config = yaml.safe_load(f)
+        else:
+            config = json.load(f)
+
+    searches = [Search.from_dict(item) for item in config.get("searches", [])]
+    if not searches:
+        raise ValueError(f"El archivo {path} no define ninguna búsqueda.")
+    return searches
+
+
+class SearchRunner:
+    """
+    Corre varias búsquedas en un mismo proceso, con un único Browser y una única
+    base. Un aviso que aparece en varias búsquedas se descarga y parsea una sola
+    vez por ciclo, y después se evalúa con el perfil de cada búsqueda.
+
+    Con `track_prices`, el mismo recorrido de los resultados guarda también los
+    precios de cada aviso (price_snapshots), que después usa track_prices.
+    """
+    def __init__(self, browser, db, notifier, searches, track_prices=False):
+        self.browser = browser
+        self.db = db
+        self.notifier = notifier
+        self.searches = searches
+        self.scraper = Scraper(browser)
+        self.track_prices_enabled = track_prices
+        # {posting_id: (datos de la página, [búsquedas])} del último recorrido
+        self.price_snapshots = {}
+
+    def collect_new_urls(self):
+        """
+        Recorre los resultados de cada búsqueda y devuelve {url: [búsquedas]} con
+        las URLs nuevas, en el orden en que aparecieron. Si se siguen los
+        precios, en el mismo recorrido completa price_snapshots con los precios
+        que trae la página (ver Scraper.extract_listing_prices).
+        """
+        default_max_pages = int(os.environ.get("MAX_SEARCH_PAGES", 10))
+        new_urls = {}
+        self.price_snapshots = {}
+        for search in self.searches:
+            print(f"🔎 Búsqueda '{search.name}'")
+            scraper_list = Scraper(browser_instance=self.browser, scrape_url=search.scrape_url)
+            max_pages = search.max_pages or default_max_pages
+            on_prices = None
+            if self.track_prices_enabled:
+                on_prices = lambda listings, search=search: self._add_price_snapshots(listings, search)
+            for url in scraper_list.crawl_new_urls(self.db.filter_new, max_pages=max_pages, on_prices=on_prices):
+                if is_listing_url(url):
+                    new_urls.setdefault(url, []).append(search)
+        return new_urls
+
+    def _add_price_snapshots(self, listings, search):
+        for listing in listings:
+            if listing["posting_id"] and listing["price"] is not None:
+                self.price_snapshots.setdefault(listing["posting_id"], (listing, []))[1].append(search)
+
+    def notify(self, url, data, searches):
+        """Evalúa el aviso con el perfil de cada búsqueda y notifica a su chat."""
+        for search in searches:
+            with metrics.timer("checker"):
+                message = PROFILES[search.profile](url, data)
+            if message:
+                self.notifier.send_message(message, chat_id=search.chat_id)
+                metrics.incr("notifications")
+                print(f"🚀 Notificación enviada a Telegram ({search.name}).")
+
+    def run_cycle(self):
+        """
+        Corre una pasada completa de todas las búsquedas: procesa los avisos
+        nuevos, los guarda y notifica. Devuelve cuántos avisos guardó.
+        """
+        # Lo que guardaron otros procesos sobre la misma base desde el ciclo anterior
+        self.db.refresh_seen()
+        new_urls = self.collect_new_urls()
+        saved, _ = self.process_listings(new_urls)
+        return saved
+
+    def enqueue_cycle(self):
+        """
+        Como run_cycle, pero solo recorre las búsquedas y deja las URLs nuevas en
+        la cola de la base para que las procesen los workers (ver worker.py).
+        Devuelve cuántas URLs encoló.
+        """
+        # Lo que guardaron los workers desde el ciclo anterior; enqueue_listings
+        # además descarta en la base lo que se haya guardado en el medio
+        self.db.refresh_seen()
+        new_urls = self.collect_new_urls()
+        queued = self.db.enqueue_listings({url: [search.name for search in searches]
+                                           for url, searches in new_urls.items()})
+        print(f"📥 {queued} aviso(s) encolado(s) de {len(new_urls)} nuevo(s).")
+        return queued
+
+    def process_listings(self, new_urls):
+        """
+        Descarga, guarda y notifica los avisos de `new_urls` ({url: [búsquedas]}).
+        Devuelve (guardados, {url: motivo}) con los avisos que no se pudieron
+        procesar; los demás quedaron guardados (o descartados a propósito).
+        Se guardan de a SAVE_BATCH_SIZE y cada aviso se notifica recién
+        después de que su lote quedó guardado.
+        """
+        # Solo se descarga el bloque avisoInfo de cada aviso, no la página entera
+        pipeline = FetchPipeline(self.browser, fetch=self.scraper.fetch_aviso_info_block)
+
+        failed = {}
+        saved = []
+        # Lote actual sin guardar: avisos, eventos de republicación y notificaciones pendientes
+        batch, relistings, alerts = [], [], []
+        # Avisos de este ciclo, para agrupar también los duplicados que llegan juntos
+        cycle_index = SeenIndex()
+        try:
+            for url, aviso_block in pipeline.fetch(new_urls):
+                searches = new_urls[url]
+                names = ", ".join(search.name for search in searches)
+                print(f"\n{'='*50}\nInmueble nuevo detectado ({names}). Procesando: {url}\n")
+
+                if not aviso_block:
+                    print("❌ No se pudo obtener el bloque avisoInfo de la URL.")
+                    failed[url] = "sin bloque avisoInfo"
+                    continue
+
+                aviso_info = self.scraper.reduce_html_to_aviso_info(aviso_block)
+                if not aviso_info:
+                    print("❌ No se pudo encontrar/parsear 'avisoInfo' dentro del HTML.")
+                    failed[url] = "avisoInfo no parseable"
+                    continue
+
+                json_structured_info = self.scraper.structured_attributes(aviso_info)
+
+                relisted, previous_price = self.db.find_relisting(json_structured_info)
+                # La propiedad se acumula y se guarda por lotes, siempre antes de notificarla
+                batch.append((url, json_structured_info))
+                metrics.incr("listings_new")
+
+                if relisted:
+                    # Mismo inmueble con otro idAviso: se guarda, pero no se vuelve a notificar
+                    print(f"♻️ Republicación de un aviso ya visto (precio anterior: {previous_price}, "
+                          f"actual: {json_structured_info.get('price')}). No se notifica.")
+                    relistings.append((url, {
+                        "posting_id": json_structured_info.get("id") or posting_id_from_url(url),
+                        "event": "relisted",
+                        "price": parse_amount(json_structured_info.get("price")),
+                        "currency": json_structured_info.get("currency"),
+                        "expenses": parse_amount(json_structured_info.get("expenses")),
+                        "previous_price": previous_price,
+                    }))
+                else:
+                    posting_id = json_structured_info.get("id") or posting_id_from_url(url)
+                    signature = minhash_signature(json_structured_info)
+                    facts = listing_facts(json_structured_info)
+                    group, similarity = self.db.find_near_duplicate(signature, facts)
+                    if group is None:
+                        group, similarity = cycle_index.find_near_duplicate(signature, facts)
+                    cycle_index.add(url, posting_id, signature=signature, duplicate_of=group, facts=facts)
+                    if group is not None:
+                        # Mismo inmueble publicado por otra inmobiliaria: se agrupa y no se notifica
+                        json_structured_info["duplicate_of"] = group
+                        metrics.incr("listings_duplicate")
+                        print(f"👯 Casi igual al aviso {group} (similitud {similarity:.0%}). No se notifica.")
+                    else:
+                        alerts.append((url, json_structured_info, searches))
+
+                if len(batch) >= SAVE_BATCH_SIZE:
+                    saved += self._save_batch(batch, relistings, alerts, failed)
+                    batch, relistings, alerts = [], [], []
+        finally:
+            saved += self._save_batch(batch, relistings, alerts, failed)
+            print(f"✅ {len(saved)} inmueble(s) guardado(s) en la base de datos.")
+
+        return len(saved), failed
+
+    def _save_batch(self, batch, relistings, alerts, failed):
+        """
+        Guarda un lote de avisos en un solo INSERT y, recién cuando se confirmó,
+        registra sus republicaciones y envía sus notificaciones. Así un corte a
+        mitad de ciclo nunca deja avisos notificados sin guardar, que en el
+        próximo ciclo se tomarían como nuevos y se volverían a notificar. Si el
+        INSERT del lote falla, se reintenta de a un aviso para que una fila con
+        problemas no arrastre a las demás; las que fallan quedan en `failed` y
+        no se notifican. Devuelve la lista de URLs guardadas.
+        """
+        if not batch:
+            return []
+        try:
+            self.db.add_properties(batch)
+            saved = [url for url, _ in batch]
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el lote ({e!r}). Se guarda de a un aviso.")
+            self.db.rollback()
+            saved = []
+            for url, data in batch:
+                try:
+                    self.db.add_properties([(url, data)])
+                    saved.append(url)
+                except Exception as e:
+                    print(f"❌ No se pudo guardar {url}: {e!r}")
+                    self.db.rollback()
+                    failed[url] = f"error al guardar: {e!r}"
+
+        saved_urls = set(saved)
+        self.db.record_price_events([event for url, event in relistings
+                                     if url in saved_urls and event["posting_id"]])
+        for url, data, searches in alerts:
+            if url in saved_urls:
+                self.notify(url, data, searches)
+        return saved
+
+
+    def track_prices(self, plan=DEFAULT_PLAN):
+        """
+        Modo seguimiento: compara los avisos ya guardados con los precios de la
+        página de resultados que leyó el último ciclo (price_snapshots), sin
+        volver a recorrer las búsquedas ni abrir cada aviso. Los cambios se
+        agregan al historial (price_history) y, si una baja hace pasar un
+        chequeo que antes fallaba (por ejemplo el precio máximo), se notifica.
+        Devuelve cuántos cambios registró.
+        """
+        snapshots = self.price_snapshots
+        known = self.db.known_listings(snapshots)
+
+        events = []
+        try:
+            for posting_id, (_, url, old_price, old_currency, data) in known.items():
+                listing, searches = snapshots[posting_id]
+                data = data or {}
+                # "Consultar precio" o un texto sin número: no hay con qué comparar
+                new_price = parse_amount(listing["price"])
+                if new_price is None:
+                    continue
+                new_currency = listing["currency"] or old_currency
+                old_price = float(old_price) if old_price is not None else None
+                old_expenses = parse_amount(data.get("expenses"))
+                new_expenses = parse_amount(listing["expenses"])
+
+                price_changed = new_price != old_price or new_currency != old_currency
+                expenses_changed = new_expenses is not None and new_expenses != old_expenses
+                if not (price_changed or expenses_changed):
+                    continue
+
+                events.append({
+                    "posting_id": posting_id,
+                    "event": "price",
+                    "price": new_price,
+                    "price_text": format_price(new_price, new_currency),
+                    "currency": new_currency,
+                    "expenses": new_expenses,
+                    "previous_price": old_price,
+                })
+                print(f"💲 {url}: {format_price(old_price or 0, old_currency)} → {format_price(new_price, new_currency)}")
+
+                if old_price is None or new_currency != old_currency or new_price >= old_price:
+                    continue
+                new_data = dict(data, price=format_price(new_price, new_currency), currency=new_currency)
+                if new_expenses is not None:
+                    new_data["expenses"] = str(int(new_expenses))
+                with metrics.timer("checker"):
+                    crossed = plan.newly_passed(data, new_data)
+                if crossed:
+                    self.notify_price_drop(url, new_data, searches, old_price, crossed)
+        finally:
+            self.db.record_price_events(events)
+            print(f"✅ {len(events)} cambio(s) de precio registrado(s) de {len(known)} aviso(s) conocido(s).")
+
+        return len(events)
+
+    def notify_price_drop(self, url, data, searches, old_price, crossed):
+        """Notifica una baja de precio que hace pasar chequeos que antes fallaban."""
+        header = f"📉 Bajó de precio: {format_price(old_price, data.get('currency'))} → {data.get('price')}\n"
+        header += "".join(f"{format_result(result)}\n" for result in crossed)
+        for search in searches:
+            with metrics.timer("checker"):
+                message = PROFILES[search.profile](url, data)
+            if message:
+                self.notifier.send_message(f"{header}\n{message}", chat_id=search.chat_id)
+                metrics.incr("notifications")
+                print(f"🚀 Baja de precio notificada a Telegram ({search.name}).")
+
+
+class QueueWorker:
+    """
+    Procesa avisos de la cola de la base (ver SearchRunner.enqueue_cycle): toma
+    un lote con un lease, lo descarga, guarda y notifica con el SearchRunner, y
+    lo saca de la cola. Los que fallan vuelven a la cola con backoff hasta
+    `max_attempts`; si el worker se cae, otro los toma cuando vence el lease.
+    Se pueden correr tantos workers como se quiera, en la misma máquina o en otras.
+    """
+    def __init__(self, runner, worker_id=None, batch_size=None, lease_seconds=None,
+                 max_attempts=None, retry_delay=None):
+        if batch_size is None:
+            batch_size = int(os.environ.get("QUEUE_BATCH_SIZE", 20))
+        if lease_seconds is None:
+            lease_seconds = float(os.environ.get("QUEUE_LEASE_SECONDS", 300))
+        if max_attempts is None:
+            max_attempts = int(os.environ.get("QUEUE_MAX_ATTEMPTS", 3))
+        if retry_delay is None:
+            retry_delay = float(os.environ.get("QUEUE_RETRY_DELAY", 60))
+
+        self.runner = runner
+        self.db = runner.db
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.searches_by_name = {search.name: search for search in runner.searches}
+
+    def run_batch(self):
+        """Toma un lote de la cola y lo procesa. Devuelve cuántos avisos tomó (0 si la cola está vacía)."""
+        claimed = self.db.claim_listings(self.worker_id, self.batch_size, self.lease_seconds, self.max_attempts)
+        if not claimed:
+            return 0
+
+        # Otros workers guardan en la misma tabla: se pone al día el índice en memoria
+        # (relisting, duplicados) y la existencia se verifica contra la base
+        self.db.refresh_seen()
+        saved = self.db.saved_urls(url for _, url, _, _ in claimed)
+
+        queue_ids = {}
+        new_urls = {}
+        already_saved = []
+        for queue_id, url, names, _ in claimed:
+            if url in saved:
+                # Por ejemplo, un reintento de un aviso que se llegó a guardar antes de la falla
+                already_saved.append(queue_id)
+                continue
+            unknown = [name for name in names if name not in self.searches_by_name]
+            if unknown:
+                print(f"⚠️ Búsqueda(s) desconocida(s) para este worker: {', '.join(unknown)}. "
+                      f"El aviso se guarda sin notificarlas.")
+            queue_ids[url] = queue_id
+            new_urls[url] = [self.searches_by_name[name] for name in names if name in self.searches_by_name]
+        self.db.complete_listings(already_saved)
+
+        try:
+            _, failed = self.runner.process_listings(new_urls)
+        except Exception as e:
+            for queue_id in queue_ids.values():
+                self.db.fail_listing(queue_id, repr(e), self.max_attempts, self.retry_delay)
+            raise
+
+        done = [queue_ids[url] for url in new_urls if url not in failed]
+        self.db.complete_listings(done)
+        for url, reason in failed.items():
+            self.db.fail_listing(queue_ids[url], reason, self.max_attempts, self.retry_delay)
+        metrics.incr("queue_done", len(done) + len(already_saved))
+        metrics.incr("queue_failed", len(failed))
+        print(f"📤 Lote de {len(claimed)}: {len(done) + len(already_saved)} procesado(s), "
+              f"{len(failed)} devuelto(s) a la cola.")
+        return len(claimed)
@@ -1,51 +1,95 @@
 # scraper.py
 from bs4 import BeautifulSoup
+import os
 import re
-import json
-from typing import Any, Dict, List, Union, Optional
+from urllib.parse import urlsplit, urlunsplit
+from src.JsParser import parse_js_value, JsParseError
+from src.Dedup import posting_id_from_url
+from src.Metrics import metrics
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Union, Optional
 
 class Scraper:
     """
     A class to handle scraping a single Zonaprop listing and checking its details,
     as well as scraping multiple listings from a search results page.
     """
-    base_url = "https://www.zonaprop.com.ar"
+    BASE_URL = "https://www.zonaprop.com.ar"
     PAGE_URL_SUFFIX = '-pagina-'
     HTML_EXTENSION = '.html'
 
-    def __init__(self, browser_instance, scrape_url: Optional[str] = None) -> None:
-        """Initializes the scraper with a Browser instance."""
+    def __init__(self, browser_instance, scrape_url: Optional[str] = None, base_url: Optional[str] = None) -> None:
+        """
+        Initializes the scraper with a Browser instance. `base_url` defaults to
+        ZONAPROP_BASE_URL, which lets the whole scraper point at a local
+        stand-in server; it is read here, not at import time.
+        """
         self.browser = browser_instance
-        self.scrape_url = scrape_url
+        self.base_url = (base_url or os.environ.get("ZONAPROP_BASE_URL", self.BASE_URL)).rstrip("/")
+        self.scrape_url = self.rebase_url(scrape_url) if scrape_url else scrape_url
         self.avenidas_caba = ["pueyrredon", "corrientes", "libertador", "santa fe", "cordoba", "rivadavia", "cabildo", "lacroze", "juan b justo", "constitucion", "callao", "entre rios", "general paz"]
 
+    def rebase_url(self, url: str) -> str:
+        """Moves a zonaprop.com.ar URL onto base_url (same path and query)."""
+        parts = urlsplit(url)
+        if not parts.netloc.endswith("zonaprop.com.ar"):
+            return url
+        base = urlsplit(self.base_url)
+        return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+
     # Methods for a single listing
+    AVISO_INFO_MARKER = "avisoInfo"
+    PRELOADED_DATA_MARKERS = ('id="preloadedData"', "id='preloadedData'")
+    SCRIPT_END = "</script>"
+
+    @classmethod
+    def slice_script_block(cls, html_text: str, markers) -> str:
+        """
+        Returns the text from the first marker up to the closing </script>, using
+        plain str.find so the document is never regex-scanned end to end.
+        """
+        if isinstance(markers, str):
+            markers = (markers,)
+        positions = [p for p in (html_text.find(m) for m in markers) if p != -1]
+        if not positions:
+            return ""
+        start = min(positions)
+        end = html_text.find(cls.SCRIPT_END, start)
+        return html_text[start:] if end == -1 else html_text[start:end + len(cls.SCRIPT_END)]
+
+    @metrics.timed("listing_fetch")
+    def fetch_aviso_info_block(self, url: str) -> Optional[str]:
+        """Downloads only the avisoInfo script block of a listing page."""
+        return self.browser.get_script_block(url, "const " + self.AVISO_INFO_MARKER)
+
+    @metrics.timed("reduce_aviso_info")
     def reduce_html_to_aviso_info(self, html_text: str) -> Optional[Dict[str, Any]]:
         """
-        Searches the HTML for a block: const avisoInfo = { ... };
+        Searches the HTML (or the already sliced script block) for
+        const avisoInfo = { ... }; and parses the JS object literal in a single
+        pass, returning it as a dict.
         """
         if not html_text:
             return None
 
-        match = re.search(r"const\s+avisoInfo\s*=\s*(\{[\s\S]*?\});", html_text, re.DOTALL)
-        if not match:
+        # Find "avisoInfo" followed by "=" (skipping usages like avisoInfo.x)
+        position = html_text.find(self.AVISO_INFO_MARKER)
+        while position != -1:
+            value_start = position + len(self.AVISO_INFO_MARKER)
+            while value_start < len(html_text) and html_text[value_start].isspace():
+                value_start += 1
+            if html_text[value_start:value_start + 1] == "=" and html_text[value_start + 1:value_start + 2] != "=":
+                break
+            position = html_text.find(self.AVISO_INFO_MARKER, value_start)
+        if position == -1:
             return None
 
-        raw_obj = match.group(1).strip()
-
-        # Clean similar to reduce.py
-        # 1) Remove trailing commas before ] or }
-        cleaned = re.sub(r",\s*([\}\]])", r"\1", raw_obj)
-        # 2) Remove single-line comments //
-        cleaned = re.sub(r"//.*$", "", cleaned, flags=re.MULTILINE)
-        # 3) Add quotes to unquoted keys (heuristic)
-        cleaned = re.sub(r'(\w+)\s*:', r'"\1":', cleaned)
-
-        # Remove the final semicolon if it remains
-        if cleaned.endswith(';'):
-            cleaned = cleaned[:-1].rstrip()
+        try:
+            aviso_info, _ = parse_js_value(html_text, value_start + 1)
+        except JsParseError as e:
+            print(f"Error parsing avisoInfo: {e}")
+            return None
 
-        return cleaned
+        return aviso_info if isinstance(aviso_info, dict) else None
 
     def parse_number_from_text(self, text: Union[str, int]) -> int:
         """
@@ -58,97 +102,285 @@ class Scraper:
         number_match = re.search(r'(\d+)', cleaned_text)
         return int(number_match.group(1)) if number_match else 0
     
-    def structured_attributes(self, aviso_info_str: str) -> str:
+    @staticmethod
+    def _find_key(node: Any, key: str, scalar: bool = False) -> Any:
+        """
+        Depth-first search (in document order) for the first value stored under
+        `key`. With scalar=True, values that are dicts or lists are skipped.
+        """
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                if key in current:
+                    value = current[key]
+                    if not scalar or not isinstance(value, (dict, list)):
+                        return value
+                children = list(current.values())
+            elif isinstance(current, list):
+                children = current
+            else:
+                continue
+            stack.extend(reversed(children))
+        return None
+
+    @classmethod
+    def _find_labeled_value(cls, node: Any, label: str) -> Any:
+        """Returns the 'value' of the first feature whose 'label' matches."""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                if current.get("label") == label and "value" in current:
+                    return current["value"]
+                stack.extend(reversed(list(current.values())))
+            elif isinstance(current, list):
+                stack.extend(reversed(current))
+        return None
+
+    ATTRIBUTE_ORDER = (
+        "id", "title", "price", "expenses", "currency", "location", "property_type",
+        "bedrooms", "bathrooms", "surface_total", "surface_covered", "floor", "description",
+        "address", "publication_date", "publisher_id", "publisher_name", "whatsapp",
+        "latitude", "longitude", "general_features", "main_features",
+    )
+
+    @metrics.timed("structured_attributes")
+    def structured_attributes(self, aviso_info: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Extracts structured attributes from the avisoInfo string.
+        Extracts structured attributes from the parsed avisoInfo dict.
         """
         structured = {}
-        
-        # Patterns for each attribute.
-        patrones = {
-            "id": r"'idAviso':\s*['\"](.*?)['\"]",
-            "title": r"'postingTitle'\s*:\s*['\"](.*?)['\"]",
-            "price": r"'price'\s*:\s*['\"](.*?)['\"]",
-            "expenses": r"'expenses'\s*:\s*['\"](.*?)['\"]",
-            "currency": r"'pricesData':\s*\[.*?\"currency\":\"(.*?)\"",
-            "location": r"'location':\s*{.*?['\"]name['\"]\s*:\s*['\"](.*?)['\"].*?}",
-            "property_type": r"'realEstateType':\s*{.*?['\"]name['\"]\s*:\s*['\"](.*?)['\"].*?}",
-            "bedrooms": r"['\"]label['\"]\s*:\s*['\"]dorm\.['\"].*?['\"]value['\"]\s*:\s*['\"](.*?)['\"]",
-            "bathrooms": r"['\"]label['\"]\s*:\s*['\"]baño['\"].*?['\"]value['\"]\s*:\s*['\"](.*?)['\"]",
-            "surface_total": r"['\"]label['\"]\s*:\s*['\"]tot\.['\"].*?['\"]value['\"]\s*:\s*['\"](.*?)['\"]",
-            "surface_covered": r"['\"]label['\"]\s*:\s*['\"]cub\.['\"].*?['\"]value['\"]\s*:\s*['\"](.*?)['\"]",
-            "description": r"'description'\s*:\s*(.*?)(?=\s*['\"]address['\"]\s*:)",
-            "address": r"'address':\s*{.*?['\"]name['\"]\s*:\s*['\"](.*?)['\"].*?}",
-            "publication_date": r"'postingDate':\s*['\"](.*?)['\"]",
-            "publisher_id": r"'publisherId':\s*['\"](.*?)['\"]",
-            "publisher_name": r"'publisher':\s*{.*?['\"]name['\"]\s*:\s*['\"](.*?)['\"].*?}",
-            "whatsapp": r"'whatsApp':\s*['\"](.*?)['\"]",
-            "general_features": r"'generalFeatures':\s*({.*?}),\s*'location'",
-            "main_features": r"'mainFeatures':\s*({.*?}),\s*'realEstateType'",
+
+        # Scalar attributes: first value found under the given key.
+        scalar_keys = {
+            "id": "idAviso",
+            "title": "postingTitle",
+            "price": "price",
+            "expenses": "expenses",
+            "publication_date": "postingDate",
+            "publisher_id": "publisherId",
+            "whatsapp": "whatsApp",
         }
+        # Attributes that live in the 'name' of a nested object.
+        named_keys = {
+            "location": "location",
+            "property_type": "realEstateType",
+            "address": "address",
+            "publisher_name": "publisher",
+        }
+        # Attributes that come from a {'label': ..., 'value': ...} feature.
+        labeled_keys = {
+            "bedrooms": "dorm.",
+            "bathrooms": "baño",
+            "surface_total": "tot.",
+            "surface_covered": "cub.",
+            "floor": "piso",
+        }
+
+        for attribute, key in scalar_keys.items():
+            structured[attribute] = self._find_key(aviso_info, key, scalar=True)
 
-        for key, pattern in patrones.items():
-            match = re.search(pattern, aviso_info_str, re.DOTALL)
-            if match:
-                value = match.group(1).strip()
-                
-                if key in ["general_features", "main_features"]:
-                    try:
-                        # Replace single with double quotes and fix syntax
-                        temp_json_str = value.replace("'", '"')
-                        temp_json_str = re.sub(r'\"(null|false|true)\"', r'\1', temp_json_str)
-                        
-                        parsed_json = json.loads(temp_json_str)
-                        structured[key] = parsed_json
-                    except json.JSONDecodeError as e:
-                        print(f"Error decoding JSON for {key}: {e}")
-                        structured[key] = value
-                else:
-                    structured[key] = value
-        
-        # Additional cleaning for description
-        if "description" in structured:
-            clean_description = re.sub(r'<[^>]+>', '', structured["description"])
+        prices_data = self._find_key(aviso_info, "pricesData")
+        structured["currency"] = self._find_key(prices_data, "currency", scalar=True)
+
+        for attribute, key in named_keys.items():
+            node = self._find_key(aviso_info, key)
+            structured[attribute] = self._find_key(node, "name", scalar=True)
+
+        for attribute, label in labeled_keys.items():
+            structured[attribute] = self._find_labeled_value(aviso_info, label)
+
+        # postingLocation.postingGeolocation.geolocation: {'latitude': ..., 'longitude': ...}
+        geolocation = self._find_key(aviso_info, "geolocation")
+        if isinstance(geolocation, dict):
+            structured["latitude"] = self._find_key(geolocation, "latitude", scalar=True)
+            structured["longitude"] = self._find_key(geolocation, "longitude", scalar=True)
+
+        description = self._find_key(aviso_info, "description", scalar=True)
+        if description is not None:
+            clean_description = re.sub(r'<[^>]+>', '', str(description))
             structured["description"] = clean_description.replace("&quot;", '"').strip()
 
-        return json.dumps(structured, indent=2, ensure_ascii=False)
+        for attribute, key in (("general_features", "generalFeatures"), ("main_features", "mainFeatures")):
+            features = self._find_key(aviso_info, key)
+            if isinstance(features, dict):
+                structured[attribute] = features
+
+        # Keep only what was found, as plain stripped strings for scalar values.
+        result = {}
+        for attribute in self.ATTRIBUTE_ORDER:
+            value = structured.get(attribute)
+            if value is None:
+                continue
+            if isinstance(value, (dict, list)):
+                result[attribute] = value
+            elif isinstance(value, bool):
+                result[attribute] = str(value).lower()
+            else:
+                result[attribute] = str(value).strip()
+        return result
 
     def extract_data(self, soup):
         container = soup.find("div", {"class":"postings-container"})
         return container
 
-    def scrape_web(self) -> List[str]:
+    def _page_url(self, page: int) -> str:
+        """Builds the URL of the given search results page (1-based)."""
+        stem = self.scrape_url
+        if stem.endswith(self.HTML_EXTENSION):
+            stem = stem[:-len(self.HTML_EXTENSION)]
+        if page <= 1:
+            return f"{stem}{self.HTML_EXTENSION}"
+        return f"{stem}{self.PAGE_URL_SUFFIX}{page}{self.HTML_EXTENSION}"
+
+    @classmethod
+    def slice_preloaded_block(cls, raw_html: str) -> str:
+        """Devuelve el bloque del <script id='preloadedData'> hasta su </script>, o ''."""
+        return cls.slice_script_block(raw_html, cls.PRELOADED_DATA_MARKERS)
+
+    @staticmethod
+    def extract_main_entity_urls(html_string: str) -> List[str]:
         """
-        Scrapes a search results page and extracts exactly the seven property URLs
-        from the mainEntity list within the preloadedData block.
+        Returns every "url" inside the "mainEntity" list of the preloadedData block,
+        however many listings the page has.
         """
+        start = html_string.find('"mainEntity":[')
+        if start == -1:
+            return []
+
+        # Walk the list matching brackets (ignoring the ones inside strings)
+        # to find where it closes.
+        i = start + len('"mainEntity":')
+        depth = 0
+        in_string = False
+        end = len(html_string)
+        while i < len(html_string):
+            char = html_string[i]
+            if in_string:
+                if char == '\\':
+                    i += 1
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in '[{':
+                depth += 1
+            elif char in ']}':
+                depth -= 1
+                if depth == 0:
+                    end = i + 1
+                    break
+            i += 1
+
+        # dict.fromkeys removes repeated URLs keeping the page order
+        return list(dict.fromkeys(re.findall(r'"url":"(.*?)"', html_string[start:end])))
+
+    LIST_POSTINGS_MARKER = '"listPostings":'
+
+    def extract_listing_prices(self, block: str) -> List[Dict[str, Any]]:
+        """
+        Reads the price data that the search results page already carries for
+        each listing (the listPostings array of the preloadedData block), so known
+        listings can be re-checked without fetching their pages. Returns dicts
+        with url, posting_id, price, currency and expenses.
+        """
+        start = block.find(self.LIST_POSTINGS_MARKER)
+        if start == -1:
+            return []
+        try:
+            postings, _ = parse_js_value(block, start + len(self.LIST_POSTINGS_MARKER))
+        except JsParseError as e:
+            print(f"Error parsing listPostings: {e}")
+            return []
+        if not isinstance(postings, list):
+            return []
+
+        listings = []
+        for posting in postings:
+            if not isinstance(posting, dict) or not posting.get("url"):
+                continue
+            url = posting["url"]
+            if url.startswith("/"):
+                url = self.base_url + url
+
+            # priceOperationTypes: [{"prices": [{"amount": ..., "currency": ...}]}]
+            prices = self._find_key(posting, "prices")
+            price = prices[0] if isinstance(prices, list) and prices and isinstance(prices[0], dict) else {}
+            expenses = posting.get("expenses")
+            if isinstance(expenses, dict):
+                expenses = expenses.get("amount")
+
+            listings.append({
+                "url": url,
+                "posting_id": str(posting.get("postingId") or posting_id_from_url(url) or "") or None,
+                "price": price.get("amount"),
+                "currency": price.get("currency"),
+                "expenses": expenses,
+            })
+        return listings
+
+    def fetch_search_block(self, page: int = 1) -> str:
+        """Downloads only the preloadedData block of a search results page ('' if missing)."""
         if not self.scrape_url:
             raise ValueError("scrape_url must be provided to use scrape_web method.")
+        with metrics.timer("search_page_fetch"):
+            return self.browser.get_script_block(self._page_url(page), self.PRELOADED_DATA_MARKERS) or ""
 
-        page_url = f"{self.scrape_url}{self.HTML_EXTENSION}"
-        page = self.browser.get_text(page_url)
-        
-        # Define la función slice_preloaded_block como la tenías
-        def slice_preloaded_block(raw_html: str) -> str:
-            """Devuelve el <script id='preloadedData'>...</script> completo, o ''."""
-            m = re.search(
-                r'<script[^>]*\bid=["\']preloadedData["\'][^>]*>.*?</script>',
-                raw_html, flags=re.DOTALL | re.IGNORECASE
-            )
-            return m.group(0) if m else ""
-
-        html_string = slice_preloaded_block(page)
-        
-        # --- Modificación: Expresión regular más específica ---
-        # El nuevo patrón busca específicamente las URLs dentro del bloque "mainEntity"
-        # que es la lista de 7 elementos que quieres.
-        pattern = re.compile(r'\"mainEntity\":\[.*?(\"url\":\".*?\".*?){7}\]', re.DOTALL)
-        
-        match = pattern.search(html_string)
-        if match:
-            # Encuentra todas las URLs dentro de la coincidencia
-            url_pattern = re.compile(r'"url":"(.*?)"')
-            urls = url_pattern.findall(match.group(0))
-            return urls
-        
-        return []
+    def scrape_page(self, page: int = 1) -> List[str]:
+        """Scrapes a single search results page and returns its listing URLs."""
+        # Only the preloadedData block is downloaded; the rest of the page is skipped
+        preloaded_block = self.fetch_search_block(page)
+        if not preloaded_block:
+            return []
+        return self.extract_main_entity_urls(preloaded_block)
+
+    def scrape_web(self) -> List[str]:
+        """
+        Scrapes the first search results page and extracts the property URLs
+        from the mainEntity list within the preloadedData block.
+        """
+        return self.scrape_page(1)
+
+    def iter_search_pages(self, max_pages: Optional[int] = None,
+                          with_prices: bool = False) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+        """
+        Lazily walks the -pagina-N search pages, yielding (URLs, price data) for
+        each one. The price data (see extract_listing_prices) comes from the same
+        preloadedData block and is only parsed with `with_prices`; otherwise it is
+        an empty list. Stops on an empty page, or when Zonaprop serves a page we
+        already saw (it redirects past the last page back to the last one).
+        """
+        seen = set()
+        page = 1
+        while max_pages is None or page <= max_pages:
+            preloaded_block = self.fetch_search_block(page)
+            urls = self.extract_main_entity_urls(preloaded_block) if preloaded_block else []
+            if not urls or seen.issuperset(urls):
+                return
+            seen.update(urls)
+            yield urls, self.extract_listing_prices(preloaded_block) if with_prices else []
+            page += 1
+
+    def crawl_new_urls(self, filter_new: Callable[[List[str]], List[str]],
+                       max_pages: Optional[int] = None,
+                       on_prices: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Iterator[str]:
+        """
+        Paginated crawl that yields only the URLs not stored yet. `filter_new`
+        receives the URLs of a page and returns the ones that are new. The crawl
+        stops as soon as a whole page is already known, so a steady-state poll
+        costs one or two requests.
+
+        With `on_prices`, the price data of every page is passed to it during the
+        same crawl (for price tracking), and the crawl goes on through the known
+        pages up to `max_pages`, since those are the listings being tracked.
+        """
+        pages = self.iter_search_pages(max_pages, with_prices=on_prices is not None)
+        for page_number, (urls, listings) in enumerate(pages, start=1):
+            new_urls = filter_new(urls)
+            print(f"📄 Página {page_number}: {len(urls)} avisos, {len(new_urls)} nuevos.")
+            if on_prices is not None:
+                on_prices(listings)
+            yield from new_urls
+            if not new_urls and on_prices is None:
+                return
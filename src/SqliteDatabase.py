@@ -0,0 +1,339 @@
+# src/SqliteDatabase.py
+import datetime
+import json
+import sqlite3
+import threading
+from src.Metrics import metrics
+from src.Dedup import posting_id_from_url
+from src.Storage import INSERT_COLUMNS, TYPED_COLUMNS, Storage
+
+# Equivalentes en SQLite de los tipos de TYPED_COLUMNS. Las fechas se guardan
+# en ISO 8601 y la firma MinHash como JSON.
+SQLITE_TYPES = {"NUMERIC": "REAL", "DATE": "TEXT", "BIGINT[]": "TEXT"}
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS properties_posting_id_idx ON properties (posting_id)",
+    "CREATE INDEX IF NOT EXISTS properties_currency_price_idx ON properties (currency, price)",
+    "CREATE INDEX IF NOT EXISTS properties_location_idx ON properties (location)",
+    "CREATE INDEX IF NOT EXISTS properties_publication_date_idx ON properties (publication_date)",
+    "CREATE INDEX IF NOT EXISTS properties_processed_at_idx ON properties (processed_at)",
+    "CREATE INDEX IF NOT EXISTS properties_content_hash_idx ON properties (content_hash)",
+    "CREATE INDEX IF NOT EXISTS properties_duplicate_of_idx ON properties (duplicate_of)",
+    "CREATE INDEX IF NOT EXISTS price_history_posting_idx ON price_history (posting_id, observed_at)",
+    "CREATE INDEX IF NOT EXISTS listing_queue_status_idx ON listing_queue (status, available_at)",
+)
+
+# Las sentencias son constantes con parámetros: sqlite3 las compila una vez
+# por conexión y las reutiliza desde su cache de sentencias preparadas.
+INSERT_SQL = (f"INSERT OR IGNORE INTO properties ({', '.join(INSERT_COLUMNS)}) "
+              f"VALUES ({', '.join('?' * len(INSERT_COLUMNS))})")
+SEEN_SQL = """
+    SELECT id, url, posting_id, content_hash, price, minhash, duplicate_of, currency, surface_total, surface_covered
+    FROM properties WHERE id > ?
+"""
+SCAN_SQL = "SELECT id, url, processed_at, json_data FROM properties WHERE id > ? ORDER BY id LIMIT ?"
+KNOWN_SQL = """
+    SELECT posting_id, id, url, price, currency, json_data FROM properties
+    WHERE posting_id IN (SELECT value FROM json_each(?))
+"""
+HISTORY_SQL = """
+    INSERT INTO price_history (posting_id, observed_at, event, price, currency, expenses, previous_price)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+PRICE_UPDATE_SQL = """
+    UPDATE properties SET price = ?, currency = ?, json_data = json_patch(json_data, ?)
+    WHERE posting_id = ?
+"""
+SAVED_SQL = """
+    SELECT url, posting_id FROM properties WHERE url IN (SELECT value FROM json_each(?))
+    UNION
+    SELECT url, posting_id FROM properties WHERE posting_id IN (SELECT value FROM json_each(?))
+"""
+# No se encolan los avisos que ya están guardados (por URL o idAviso)
+ENQUEUE_SQL = """
+    INSERT OR IGNORE INTO listing_queue (url, searches)
+    SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM properties WHERE url = ?)
+                  AND NOT EXISTS (SELECT 1 FROM properties WHERE posting_id = ?)
+"""
+EXPIRE_SQL = """
+    UPDATE listing_queue SET status = 'failed', last_error = COALESCE(last_error, 'lease vencido')
+    WHERE status = 'leased' AND lease_until < datetime('now') AND attempts >= ?
+"""
+# SQLite no tiene SKIP LOCKED, pero admite un solo escritor a la vez: el UPDATE
+# toma el lock de escritura y ningún otro proceso puede llevarse los mismos avisos
+CLAIM_SQL = """
+    UPDATE listing_queue SET
+        status = 'leased', leased_by = ?, attempts = attempts + 1, lease_until = datetime('now', ?)
+    WHERE id IN (
+        SELECT id FROM listing_queue
+        WHERE ((status = 'pending' AND available_at <= datetime('now'))
+               OR (status = 'leased' AND lease_until < datetime('now')))
+          AND attempts < ?
+        ORDER BY id
+        LIMIT ?
+    )
+    RETURNING id, url, searches, attempts
+"""
+COMPLETE_SQL = "DELETE FROM listing_queue WHERE id = ?"
+FAIL_SQL = """
+    UPDATE listing_queue SET
+        status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+        available_at = datetime('now', '+' || (attempts * ?) || ' seconds'),
+        leased_by = NULL, lease_until = NULL, last_error = ?
+    WHERE id = ?
+"""
+TYPED_COLUMN_NAMES = tuple(column for column, _ in TYPED_COLUMNS)
+BACKFILL_SQL = (
+    f"UPDATE properties SET {', '.join(f'{column} = ?' for column in TYPED_COLUMN_NAMES)} "
+    f"WHERE id = ? AND ({', '.join(TYPED_COLUMN_NAMES)}) IS NOT ({', '.join('?' * len(TYPED_COLUMN_NAMES))})"
+)
+
+
+def _to_sqlite(value):
+    """Adapta un valor de una fila de INSERT_COLUMNS a lo que guarda SQLite."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return json.dumps(value)
+    return value
+
+
+class SqliteDatabase(Storage):
+    """
+    Backend local sobre un archivo SQLite en modo WAL: no necesita servidor y
+    las lecturas no bloquean a la escritura. Cada operación de escritura es una
+    sola transacción (executemany + un commit). La conexión se comparte entre
+    hilos, protegida por un lock, como en ResponseCache.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Con WAL, NORMAL no pierde consistencia ante un corte; solo la última transacción
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self._create_table()
+
+    def _create_table(self):
+        typed = ",\n".join(f"{column} {SQLITE_TYPES.get(sql_type, sql_type)}" for column, sql_type in TYPED_COLUMNS)
+        with self.conn:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS properties (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL UNIQUE,
+                    processed_at TEXT,
+                    json_data TEXT,
+                    {typed}
+                )
+            """)
+            # Una base de una versión anterior: las columnas tipadas que falten se agregan al
+            # instante; migrate.py completa sus valores en las filas viejas
+            existing = {row[1] for row in self.conn.execute("PRAGMA table_info(properties)")}
+            for column, sql_type in TYPED_COLUMNS:
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE properties ADD COLUMN {column} "
+                                      f"{SQLITE_TYPES.get(sql_type, sql_type)}")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    posting_id TEXT NOT NULL,
+                    observed_at TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    price REAL,
+                    currency TEXT,
+                    expenses REAL,
+                    previous_price REAL
+                )
+            """)
+            # Cola de avisos por procesar, compartida por los workers (ver worker.py)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS listing_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL UNIQUE,
+                    searches TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at TEXT NOT NULL DEFAULT (datetime('now')),
+                    leased_by TEXT,
+                    lease_until TEXT,
+                    last_error TEXT,
+                    enqueued_at TEXT NOT NULL DEFAULT (datetime('now'))
+                )
+            """)
+            for statement in INDEXES:
+                self.conn.execute(statement)
+
+    def migrate_schema(self):
+        """
+        El esquema completo ya se crea al conectarse (en SQLite los locks son de
+        todo el archivo y crear lo que falta es instantáneo); se mantiene para
+        que migrate.py funcione con los dos backends.
+        """
+        self._create_table()
+
+    def add_property(self, url, json_structured_info):
+        """Añade una nueva propiedad a la base de datos."""
+        self.add_properties([(url, json_structured_info)])
+
+    @metrics.timed("db_insert")
+    def add_properties(self, batch):
+        """
+        Añade varias propiedades en una sola transacción. `batch` es una lista
+        de tuplas (url, json_structured_info); las URLs que ya existen se ignoran.
+        """
+        if not batch:
+            return
+        processed_at = datetime.datetime.now()
+        rows = [self._insert_row(url, processed_at, info) for url, info in batch]
+        with self._lock, self.conn:
+            self.conn.executemany(INSERT_SQL, [tuple(map(_to_sqlite, row)) for row in rows])
+        self._remember(rows)
+
+    def _load_seen_rows(self, after_id=0):
+        with self._lock:
+            rows = self.conn.execute(SEEN_SQL, (after_id,)).fetchall()
+        for row_id, url, posting_id, digest, price, signature, duplicate_of, *facts in rows:
+            yield (row_id, url, posting_id, digest, price, json.loads(signature) if signature else None,
+                   duplicate_of, *facts)
+
+    @metrics.timed("db_check")
+    def _saved_rows(self, urls, posting_ids):
+        with self._lock:
+            return self.conn.execute(SAVED_SQL, (json.dumps(urls), json.dumps(posting_ids))).fetchall()
+
+    @staticmethod
+    def _decode(row_id, url, processed_at, data):
+        return (row_id, url, datetime.datetime.fromisoformat(processed_at) if processed_at else None,
+                json.loads(data) if data else {})
+
+    def iter_properties(self, chunk_size=1000, after_id=0):
+        """
+        Recorre la tabla por rangos de id, de a `chunk_size` filas, así la
+        memoria no depende de la cantidad de filas. Devuelve listas de tuplas
+        (id, url, processed_at, json_data), en orden de id.
+        """
+        while True:
+            with self._lock:
+                rows = self.conn.execute(SCAN_SQL, (after_id, chunk_size)).fetchall()
+            if not rows:
+                return
+            after_id = rows[-1][0]
+            yield [self._decode(*row) for row in rows]
+
+    @metrics.timed("db_check")
+    def known_listings(self, posting_ids):
+        """
+        Estado guardado de los avisos con esos idAviso, en una sola consulta:
+        {posting_id: (id, url, price, currency, json_data)}.
+        """
+        posting_ids = list(posting_ids)
+        if not posting_ids:
+            return {}
+        with self._lock:
+            rows = self.conn.execute(KNOWN_SQL, (json.dumps(posting_ids),)).fetchall()
+        return {
+            posting_id: (row_id, url, price, currency, json.loads(data) if data else {})
+            for posting_id, row_id, url, price, currency, data in rows
+        }
+
+    @metrics.timed("db_insert")
+    def record_price_events(self, events):
+        """
+        Agrega los eventos al historial y, para los cambios de precio, actualiza
+        el precio vigente del aviso, en una sola transacción. Los eventos tienen
+        la misma forma que en Database.record_price_events.
+        """
+        if not events:
+            return
+        observed_at = datetime.datetime.now().isoformat()
+        history = [
+            (e["posting_id"], observed_at, e["event"], e.get("price"), e.get("currency"),
+             e.get("expenses"), e.get("previous_price"))
+            for e in events
+        ]
+        updates = []
+        for e in events:
+            if e["event"] != "price":
+                continue
+            patch = {"price": e["price_text"], "currency": e.get("currency")}
+            if e.get("expenses") is not None:
+                patch["expenses"] = str(int(e["expenses"]))
+            updates.append((e.get("price"), e.get("currency"), json.dumps(patch), e["posting_id"]))
+        with self._lock, self.conn:
+            self.conn.executemany(HISTORY_SQL, history)
+            self.conn.executemany(PRICE_UPDATE_SQL, updates)
+
+    def enqueue_listings(self, new_urls):
+        """
+        Encola las URLs de `new_urls` ({url: [nombres de búsqueda]}). Las que ya
+        están en la cola o ya guardadas en properties se ignoran (ver
+        Database.enqueue_listings). Devuelve cuántas se agregaron.
+        """
+        if not new_urls:
+            return 0
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(ENQUEUE_SQL, [(url, json.dumps(names), url, posting_id_from_url(url))
+                                                for url, names in new_urls.items()])
+            return self.conn.total_changes - before
+
+    @metrics.timed("queue_claim")
+    def claim_listings(self, worker_id, limit, lease_seconds, max_attempts):
+        """
+        Toma hasta `limit` avisos de la cola para `worker_id` por `lease_seconds`
+        segundos (ver Database.claim_listings). Devuelve una lista de
+        (id, url, [nombres de búsqueda], intento).
+        """
+        with self._lock, self.conn:
+            self.conn.execute(EXPIRE_SQL, (max_attempts,))
+            rows = self.conn.execute(
+                CLAIM_SQL, (worker_id, f"+{int(lease_seconds)} seconds", max_attempts, limit)
+            ).fetchall()
+        return sorted((queue_id, url, json.loads(searches), attempts) for queue_id, url, searches, attempts in rows)
+
+    def complete_listings(self, queue_ids):
+        """Saca de la cola los avisos ya procesados."""
+        if not queue_ids:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany(COMPLETE_SQL, [(queue_id,) for queue_id in queue_ids])
+
+    def fail_listing(self, queue_id, error, max_attempts, retry_delay):
+        """
+        Devuelve un aviso a la cola para reintentarlo dentro de `retry_delay`
+        segundos por intento hecho, o lo marca 'failed' si ya usó `max_attempts`.
+        """
+        with self._lock, self.conn:
+            self.conn.execute(FAIL_SQL, (max_attempts, int(retry_delay), error, queue_id))
+
+    def queue_stats(self):
+        """Cantidad de avisos en la cola por estado."""
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, count(*) FROM listing_queue GROUP BY status").fetchall())
+
+    def backfill_typed_columns(self, batch_size=1000):
+        """
+        Recalcula las columnas tipadas de todas las filas, por lotes de
+        `batch_size` con un commit cada uno. Devuelve la cantidad de filas
+        actualizadas.
+        """
+        updated = 0
+        for rows in self.iter_properties(chunk_size=batch_size):
+            pending = []
+            for row_id, _, _, data in rows:
+                values = tuple(map(_to_sqlite, self._typed_values(data)))
+                pending.append(values + (row_id,) + values)
+            with self._lock, self.conn:
+                before = self.conn.total_changes
+                self.conn.executemany(BACKFILL_SQL, pending)
+                updated += self.conn.total_changes - before
+        return updated
+
+    def rollback(self):
+        """Descarta la transacción en curso, por ejemplo después de un error."""
+        with self._lock:
+            self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
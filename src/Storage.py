@@ -0,0 +1,196 @@
+# src/Storage.py
+import json
+import os
+import threading
+from src.Normalize import normalize_property
+from src.Dedup import SeenIndex, canonical_url, content_hash, minhash_signature, posting_id_from_url
+from src.Metrics import metrics
+
+# Columnas tipadas extraídas del JSON, para filtrar sin parsear json_data.
+# Los tipos son los de Postgres; SqliteDatabase usa sus equivalentes.
+TYPED_COLUMNS = (
+    ("posting_id", "TEXT"),
+    ("price", "NUMERIC"),
+    ("currency", "TEXT"),
+    ("location", "TEXT"),
+    ("publication_date", "DATE"),
+    ("content_hash", "TEXT"),
+    ("minhash", "BIGINT[]"),
+    ("duplicate_of", "TEXT"),
+    ("surface_total", "NUMERIC"),
+    ("surface_covered", "NUMERIC"),
+)
+
+INSERT_COLUMNS = ("url", "processed_at", "json_data") + tuple(column for column, _ in TYPED_COLUMNS)
+
+# refresh_seen vuelve a leer también las últimas filas ya cargadas: los ids se
+# asignan al insertar pero las transacciones pueden confirmarse en otro orden,
+# así que una fila de otro proceso puede aparecer con un id menor al último visto.
+SEEN_REFRESH_OVERLAP = 1000
+
+
+class Storage:
+    """
+    Lo que comparten los backends de la base: cómo se arma cada fila y el
+    índice en memoria de los avisos ya guardados (SeenIndex), que responde
+    filter_new / property_exists / find_relisting sin ir a la base. Si otros
+    procesos escriben en la misma tabla, refresh_seen lo pone al día antes de
+    cada ciclo.
+
+    Cada backend implementa la escritura y las consultas: add_property,
+    add_properties, iter_properties, known_listings, record_price_events,
+    migrate_schema, backfill_typed_columns, rollback y close, más
+    _load_seen_rows(after_id), que devuelve tuplas (id, url, posting_id,
+    content_hash, price, minhash, duplicate_of) de las filas con id mayor a
+    after_id, y _saved_rows(urls, posting_ids), que devuelve (url, posting_id)
+    de las filas con alguna de esas URLs o idAviso.
+    """
+    _seen = None
+    _seen_max_id = 0
+    # Varios hilos pueden guardar a la vez (Database usa un pool de conexiones)
+    _seen_lock = threading.Lock()
+
+    @staticmethod
+    def _typed_values(json_structured_info):
+        """Valores de TYPED_COLUMNS para un aviso, en el mismo orden."""
+        normalized = normalize_property(json_structured_info)
+        normalized["content_hash"] = content_hash(json_structured_info)
+        normalized["minhash"] = minhash_signature(json_structured_info)
+        normalized["duplicate_of"] = json_structured_info.get("duplicate_of")
+        return tuple(normalized[column] for column, _ in TYPED_COLUMNS)
+
+    def _insert_row(self, url, processed_at, json_structured_info):
+        """Fila de INSERT_COLUMNS para un aviso, con la URL ya canónica."""
+        return (canonical_url(url), processed_at, json.dumps(json_structured_info)) + \
+            self._typed_values(json_structured_info)
+
+    def _remember(self, rows):
+        """Agrega al índice en memoria (si ya se cargó) las filas recién guardadas."""
+        if self._seen is None:
+            return
+        with self._seen_lock:
+            for row in rows:
+                values = dict(zip(INSERT_COLUMNS, row))
+                self._seen.add(values["url"], values["posting_id"], values["content_hash"], values["price"],
+                               values["minhash"], values["duplicate_of"],
+                               (values["currency"], values["price"], values["surface_total"],
+                                values["surface_covered"]))
+
+    def _load_seen(self, seen, after_id):
+        """Agrega a `seen` las filas con id mayor a after_id. Devuelve cuántas leyó."""
+        count = 0
+        for row_id, url, posting_id, digest, price, signature, duplicate_of, currency, *surfaces \
+                in self._load_seen_rows(after_id):
+            price = float(price) if price is not None else None
+            surfaces = [float(surface) if surface is not None else None for surface in surfaces]
+            seen.add(url, posting_id, digest, price, signature, duplicate_of, (currency, price, *surfaces))
+            self._seen_max_id = max(self._seen_max_id, row_id)
+            count += 1
+        return count
+
+    @property
+    def seen(self):
+        """
+        Índice en memoria de los avisos guardados (ver SeenIndex). Se carga de la
+        base la primera vez que se usa y después se actualiza con cada INSERT y
+        con refresh_seen.
+        """
+        if self._seen is None:
+            with self._seen_lock:
+                if self._seen is None:
+                    seen = SeenIndex()
+                    self._load_seen(seen, 0)
+                    self._seen = seen
+        return self._seen
+
+    def refresh_seen(self):
+        """
+        Agrega al índice en memoria las filas que guardaron otros procesos (otra
+        app, otro daemon o un worker) desde la última carga, leyendo solo las de
+        id mayor al último visto (menos SEEN_REFRESH_OVERLAP). Sin esto, un
+        proceso de larga duración volvería a procesar y notificar esos avisos.
+        """
+        if self._seen is None:
+            # Todavía no se cargó: el primer uso lo va a leer completo
+            return
+        with self._seen_lock:
+            count = self._load_seen(self._seen, max(0, self._seen_max_id - SEEN_REFRESH_OVERLAP))
+        metrics.incr("seen_refreshed_rows", count)
+
+    @metrics.timed("db_check")
+    def filter_new(self, urls):
+        """
+        Devuelve, en el mismo orden y en forma canónica, las URLs de avisos que
+        todavía no están en la base. Un aviso cuenta como visto si coincide la URL
+        canónica o el idAviso, así que las variantes de slug o de query no se
+        vuelven a procesar. No consulta la base: usa el índice en memoria.
+        """
+        return self.seen.filter_new(urls)
+
+    def saved_urls(self, urls):
+        """
+        URLs de `urls` que ya están guardadas (por URL canónica o idAviso),
+        consultando la base y no el índice en memoria: la usan los workers, que
+        comparten la tabla con otros procesos que escriben a la vez.
+        """
+        urls = list(urls)
+        if not urls:
+            return set()
+        canonical = {url: canonical_url(url) for url in urls}
+        posting_ids = {url: posting_id_from_url(url) for url in urls}
+        rows = self._saved_rows(sorted(set(canonical.values())),
+                                sorted({posting_id for posting_id in posting_ids.values() if posting_id}))
+        found_urls = {row_url for row_url, _ in rows}
+        found_ids = {str(posting_id) for _, posting_id in rows if posting_id}
+        return {url for url in urls if canonical[url] in found_urls or posting_ids[url] in found_ids}
+
+    def property_exists(self, url):
+        """Verifica si una propiedad ya existe en la base de datos (por URL canónica o idAviso)."""
+        return url in self.seen
+
+    def find_relisting(self, json_structured_info):
+        """
+        Busca un aviso ya guardado con el mismo contenido (ver content_hash).
+        Devuelve (True, precio anterior) si el aviso es una republicación.
+        """
+        return self.seen.find_relisting(content_hash(json_structured_info))
+
+    def find_near_duplicate(self, signature, facts=None):
+        """
+        Busca un aviso guardado casi igual a la firma MinHash dada (ver
+        minhash_signature), por ejemplo el mismo inmueble publicado por otra
+        inmobiliaria, y con precio y m² compatibles con `facts` (ver
+        listing_facts). Devuelve (idAviso del grupo, similitud) o (None, None).
+        """
+        return self.seen.find_near_duplicate(signature, facts)
+
+
+def open_database(url=None, check_schema=True):
+    """
+    Abre la base indicada por `url` (por defecto, DATABASE_URL):
+    - sqlite:///archivo.db (ruta relativa), sqlite:////ruta/absoluta.db o
+      sqlite:// (en memoria) -> SqliteDatabase, sin servidor.
+    - cualquier otra (postgresql://...) -> Database sobre Postgres.
+    Sin URL falla: usar en silencio un archivo SQLite local en un host efímero
+    perdería la base en cada deploy y se volverían a notificar todos los
+    avisos, así que SQLite hay que pedirlo explícitamente. Con
+    check_schema=False, Postgres no crea ni completa el esquema al conectarse
+    (lo usa migrate.py, que lo actualiza con su propia conexión).
+    """
+    if url is None:
+        url = os.environ.get("DATABASE_URL")
+    if not url:
+        raise ValueError("DATABASE_URL no está definida. Usá postgresql://... o, para una base local, "
+                         "sqlite:///zonaprop.db.")
+
+    if url.startswith("sqlite:"):
+        from src.SqliteDatabase import SqliteDatabase
+        path = url[len("sqlite:"):]
+        if path.startswith("///"):
+            path = path[3:]
+        elif path.startswith("//"):
+            path = path[2:]
+        return SqliteDatabase(path or ":memory:")
+
+    from src.Database import Database
+    return Database(url, check_schema=check_schema)
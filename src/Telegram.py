@@ -1,38 +1,203 @@
 # src/Telegram.py
 import os
+import queue
+import threading
+import time
+from collections import deque
 import requests
+from src.Transport import Transport
+from src.Metrics import metrics
 
 class TelegramNotifier:
-    def __init__(self, token=None, chat_id=None):
+    API_URL = "https://api.telegram.org"
+    # Largo máximo de un mensaje de texto en la API de Telegram
+    MAX_MESSAGE_LENGTH = 4096
+
+    def __init__(self, token=None, chat_id=None, transport=None, timeout=None, max_attempts=None):
         """
-        Inicializa el notificador con el token del bot y el ID del chat 
-        desde las variables de entorno.
+        Inicializa el notificador con el token del bot y el ID del chat
+        desde las variables de entorno. Reutiliza las conexiones del `transport`
+        (uno propio si no se pasa) en lugar de abrir una por mensaje.
         """
         if not token:
             token = os.environ.get("TELEGRAM_BOT_TOKEN")
         if not chat_id:
             chat_id = os.environ.get("TELEGRAM_CHAT_ID")
+        if timeout is None:
+            timeout = float(os.environ.get("TELEGRAM_TIMEOUT", 10))
+        if max_attempts is None:
+            max_attempts = int(os.environ.get("TELEGRAM_MAX_ATTEMPTS", 3))
 
         self.token = token
         self.chat_id = chat_id
+        self.api_url = os.environ.get("TELEGRAM_API_URL", self.API_URL).rstrip("/")
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
 
         if not self.token or not self.chat_id:
             raise ValueError("Las variables de entorno TELEGRAM_BOT_TOKEN y TELEGRAM_CHAT_ID deben estar definidas.")
 
-    def send_message(self, message):
+        self._owns_transport = transport is None
+        self.transport = transport or Transport()
+
+    @staticmethod
+    def _retry_after(response):
+        """Segundos de espera que pide Telegram en un 429 (parameters.retry_after)."""
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            pass
+        try:
+            return float(response.headers.get("Retry-After", 1))
+        except (TypeError, ValueError):
+            return 1.0
+
+    @metrics.timed("telegram_send")
+    def send_message(self, message, chat_id=None):
         """
-        Envía un mensaje de texto al chat de Telegram configurado.
+        Envía un mensaje de texto al chat de Telegram configurado
+        (o a `chat_id`, si se indica otro). El texto va en el cuerpo (POST JSON),
+        no en la URL, y si Telegram responde 429 se espera lo que indica
+        `retry_after` antes de reintentar.
         """
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-        params = {
-            "chat_id": self.chat_id,
+        url = f"{self.api_url}/bot{self.token}/sendMessage"
+        payload = {
+            "chat_id": chat_id or self.chat_id,
             "text": message
         }
-        try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()  # Lanza un error para respuestas 4xx/5xx
-            print("✅ Mensaje enviado a Telegram correctamente.")
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error al enviar mensaje a Telegram: {e}")
-            return None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = self.transport.post(url, json=payload, timeout=self.timeout)
+                if response.status_code == 429 and attempt < self.max_attempts:
+                    metrics.incr("telegram_rate_limited")
+                    retry_after = self._retry_after(response)
+                    print(f"⏳ Telegram pidió esperar {retry_after:.0f} s (429). Reintentando...")
+                    time.sleep(retry_after)
+                    continue
+                response.raise_for_status()  # Lanza un error para respuestas 4xx/5xx
+                metrics.incr("telegram_messages")
+                print("✅ Mensaje enviado a Telegram correctamente.")
+                return response.json()
+            except requests.exceptions.RequestException as e:
+                metrics.incr("telegram_errors")
+                print(f"❌ Error al enviar mensaje a Telegram: {e}")
+                return None
+        return None
+
+    def close(self):
+        """Cierra las conexiones, salvo que el transport sea compartido."""
+        if self._owns_transport:
+            self.transport.close()
+
+
+class TelegramQueue:
+    """
+    Cola de envío en segundo plano con la misma interfaz que TelegramNotifier:
+    send_message encola y vuelve enseguida, así una ráfaga de avisos no frena el
+    scraping. Un único hilo envía respetando un intervalo mínimo por chat y un
+    máximo global de mensajes por segundo; si se juntan varios mensajes para el
+    mismo chat, los une en uno solo (hasta el largo máximo de Telegram).
+    """
+    SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+    _STOP = object()
+
+    def __init__(self, notifier, chat_interval=None, global_rate=None, coalesce=None):
+        if chat_interval is None:
+            chat_interval = float(os.environ.get("TELEGRAM_CHAT_INTERVAL", 1))
+        if global_rate is None:
+            global_rate = float(os.environ.get("TELEGRAM_GLOBAL_RATE", 25))
+        if coalesce is None:
+            coalesce = os.environ.get("TELEGRAM_COALESCE", "1") != "0"
+
+        self.notifier = notifier
+        self.chat_id = notifier.chat_id
+        self.chat_interval = chat_interval
+        self.global_interval = 1.0 / global_rate if global_rate > 0 else 0.0
+        self.coalesce = coalesce
+
+        self._queue = queue.Queue()
+        self._pending = {}       # chat_id -> deque de mensajes sin enviar
+        self._next_slot = {}     # chat_id -> momento a partir del cual se puede enviar
+        self._next_global = 0.0
+        self._submitted = 0
+        self._done = 0
+        self._progress = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="telegram-sender", daemon=True)
+        self._thread.start()
+
+    def send_message(self, message, chat_id=None):
+        """Encola el mensaje y vuelve sin esperar el envío."""
+        with self._progress:
+            self._submitted += 1
+        self._queue.put((chat_id or self.chat_id, message))
+
+    def flush(self, timeout=None):
+        """Espera a que se envíen todos los mensajes encolados hasta ahora."""
+        with self._progress:
+            target = self._submitted
+            return self._progress.wait_for(lambda: self._done >= target, timeout=timeout)
+
+    def close(self, timeout=None):
+        """Envía lo que quede en la cola y detiene el hilo."""
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        self.notifier.close()
+
+    def _collect(self, item):
+        """Pasa un elemento de la cola a los pendientes. Devuelve True si es la señal de cierre."""
+        if item is self._STOP:
+            return True
+        chat_id, message = item
+        self._pending.setdefault(chat_id, deque()).append(message)
+        return False
+
+    def _take_batch(self, messages):
+        """Saca de `messages` lo que entra en un único mensaje de Telegram."""
+        batch = [messages.popleft()]
+        length = len(batch[0])
+        while self.coalesce and messages:
+            length += len(self.SEPARATOR) + len(messages[0])
+            if length > self.notifier.MAX_MESSAGE_LENGTH:
+                break
+            batch.append(messages.popleft())
+        return batch
+
+    def _run(self):
+        closing = False
+        while True:
+            if not self._pending:
+                if closing:
+                    return
+                closing |= self._collect(self._queue.get())
+            # Lo que llegó mientras tanto (una ráfaga) se junta con lo pendiente
+            while True:
+                try:
+                    closing |= self._collect(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not self._pending:
+                continue
+
+            chat_id = min(self._pending, key=lambda chat: self._next_slot.get(chat, 0.0))
+            delay = max(self._next_slot.get(chat_id, 0.0), self._next_global) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+
+            messages = self._pending[chat_id]
+            batch = self._take_batch(messages)
+            metrics.incr("telegram_coalesced", len(batch) - 1)
+            if not messages:
+                del self._pending[chat_id]
+            try:
+                self.notifier.send_message(self.SEPARATOR.join(batch), chat_id=chat_id)
+            except Exception as e:
+                # El hilo de envío no se cae por un mensaje con problemas
+                print(f"❌ Error inesperado al enviar a Telegram: {e!r}")
+
+            now = time.monotonic()
+            self._next_slot[chat_id] = now + self.chat_interval
+            self._next_global = now + self.global_interval
+            with self._progress:
+                self._done += len(batch)
+                self._progress.notify_all()
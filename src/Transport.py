@@ -0,0 +1,82 @@
+# src/Transport.py
+import os
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _accept_encoding():
+    """gzip/deflate siempre; brotli solo si está instalado el decodificador."""
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # noqa: F401
+        encodings.append("br")
+    except ImportError:
+        pass
+    return ", ".join(encodings)
+
+
+class Transport:
+    """
+    Capa HTTP compartida: una sesión con pool de conexiones dimensionado,
+    keep-alive y compresión. Los headers de cada request se pasan por llamada
+    y nunca se escriben en la sesión, así se puede usar desde varios hilos.
+    """
+    def __init__(self, session=None, pool_size=None, keep_alive=None, compression=True):
+        if pool_size is None:
+            pool_size = int(os.environ.get("HTTP_POOL_SIZE", max(10, int(os.environ.get("FETCH_WORKERS", 4)))))
+        if keep_alive is None:
+            keep_alive = os.environ.get("HTTP_KEEP_ALIVE", "1") != "0"
+
+        self.session = session if session is not None else requests.Session()
+        self.pool_size = pool_size
+        self._resize_pools(pool_size)
+
+        # Headers por defecto: se fijan una sola vez al construir el transporte
+        self.session.headers["Connection"] = "keep-alive" if keep_alive else "close"
+        if compression:
+            self.session.headers["Accept-Encoding"] = _accept_encoding()
+
+    def _resize_pools(self, pool_size):
+        """
+        Ajusta el tamaño del pool de cada adapter montado en la sesión.
+        Se reutilizan los adapters existentes (por ejemplo, el adapter TLS de
+        cloudscraper) en lugar de reemplazarlos.
+        """
+        for prefix in ("https://", "http://"):
+            if prefix not in self.session.adapters:
+                self.session.mount(prefix, HTTPAdapter())
+
+        for adapter in set(self.session.adapters.values()):
+            if isinstance(adapter, HTTPAdapter):
+                adapter._pool_connections = pool_size
+                adapter._pool_maxsize = pool_size
+                adapter.init_poolmanager(pool_size, pool_size, block=False)
+
+    @classmethod
+    def cloudscraper(cls, **kwargs):
+        """Transporte sobre una sesión de cloudscraper (resuelve el challenge de Cloudflare)."""
+        import cloudscraper
+        session = cloudscraper.create_scraper(
+            browser={
+                'browser': 'chrome',
+                'platform': 'windows',
+                'desktop': True
+            }
+        )
+        return cls(session=session, **kwargs)
+
+    def request(self, method, url, headers=None, **kwargs):
+        """
+        Hace un request con headers propios de esta llamada; requests los combina
+        con los de la sesión sin modificar el estado compartido.
+        """
+        return self.session.request(method, url, headers=headers, **kwargs)
+
+    def get(self, url, headers=None, **kwargs):
+        return self.request("GET", url, headers=headers, **kwargs)
+
+    def post(self, url, headers=None, **kwargs):
+        return self.request("POST", url, headers=headers, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,91 @@
+import argparse
+import importlib
+import os
+import signal
+import threading
+import time
+from src.Browser import Browser
+from src.Storage import open_database
+from src.Telegram import TelegramNotifier, TelegramQueue
+from src.Runner import QueueWorker, Search, SearchRunner, load_searches
+from src.Metrics import configure_from_env
+from daemon import APPS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Procesa los avisos que `daemon.py --enqueue` deja en la cola de la base. "
+                    "Se pueden correr varios workers a la vez, en la misma máquina o en otras."
+    )
+    parser.add_argument("app", nargs="?", choices=sorted(APPS), help="App cuyas búsquedas se notifican")
+    parser.add_argument("--config", help="Archivo JSON/YAML con las búsquedas (el mismo que usa el daemon)")
+    parser.add_argument("--worker-id", help="Nombre del worker en la cola (por defecto host-pid)")
+    parser.add_argument("--batch-size", type=int, help="Avisos por lote (por defecto QUEUE_BATCH_SIZE o 20)")
+    parser.add_argument("--lease", type=float, help="Segundos que un lote queda reservado (por defecto QUEUE_LEASE_SECONDS o 300)")
+    parser.add_argument("--idle", type=float, default=5.0, help="Segundos de espera cuando la cola está vacía (por defecto 5)")
+    parser.add_argument("--once", action="store_true",
+                        help="Termina cuando no quedan avisos pendientes ni reservados en la cola")
+    args = parser.parse_args()
+    if bool(args.app) == bool(args.config):
+        parser.error("Hay que indicar una app o un archivo --config (no ambos).")
+    return args
+
+
+def main():
+    args = parse_args()
+
+    metrics = configure_from_env()
+    browser = Browser()
+    db = open_database()
+    notifier = TelegramQueue(TelegramNotifier(token=os.environ.get("TELEGRAM_BOT_TOKEN"),
+                                              chat_id=os.environ.get("TELEGRAM_CHAT_ID")))
+
+    if args.config:
+        searches = load_searches(args.config)
+    else:
+        app = importlib.import_module(APPS[args.app])
+        searches = [Search(name=args.app, scrape_url=app.SCRAPE_URL, profile=args.app)]
+    worker = QueueWorker(SearchRunner(browser, db, notifier, searches), worker_id=args.worker_id,
+                         batch_size=args.batch_size, lease_seconds=args.lease)
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"🛑 Señal {signal.Signals(signum).name} recibida. Se termina al cerrar el lote actual.")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    print(f"👷 Worker {worker.worker_id} esperando avisos en la cola.")
+    try:
+        while not stop.is_set():
+            browser.retry_policy.reset_budget()
+            start = time.monotonic()
+            try:
+                taken = worker.run_batch()
+                status = f"{taken} aviso(s)"
+            except Exception as e:
+                # Los avisos del lote vuelven a la cola; el worker sigue con el próximo
+                taken = None
+                status = f"error: {e!r}"
+                print(f"❌ Lote fallido: {e!r}")
+            if taken == 0:
+                # Con --once se espera a los reintentos pendientes y a los lotes de otros workers
+                stats = db.queue_stats()
+                if args.once and not stats.get("pending") and not stats.get("leased"):
+                    break
+                stop.wait(args.idle)
+                continue
+            metrics.observe("queue_batch", time.monotonic() - start)
+            metrics.emit(worker=worker.worker_id, status=status)
+    finally:
+        print(f"📊 Cola: {db.queue_stats()}")
+        notifier.close()
+        db.close()
+        metrics.close()
+        print("👋 Worker detenido.")
+
+
+if __name__ == "__main__":
+    main()